@@ -1,5 +1,10 @@
 import sqlite3 
 import functools
+import inspect
+import re
+import threading
+import time
+from collections import OrderedDict
 
 def with_db_connection(func):
     """ your code goes here""" 
@@ -14,6 +19,313 @@ def with_db_connection(func):
         return result 
     return wrapper
 
+
+#### pooled variant: reuse connections instead of reconnecting on every call
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,  # negative means KiB, so ~20 MB of page cache
+}
+
+
+DEFAULT_CACHED_STATEMENTS = 512  # sqlite3's own default is 128
+
+
+#### statement reuse: equivalent ad-hoc queries share one prepared statement
+_TOKEN_RE = re.compile(r"""
+      (?P<keep>[xX]'[^']*'                  # blob literal
+        | "(?:[^"]|"")*" | `[^`]*` | \[[^\]]*\]  # quoted identifiers
+        | --[^\n]* | /\*.*?\*/            # comments
+        | \bAS\s+\w+(?:\s+\w+){0,2}\s*       # type size in a CAST, e.g.
+          \(\s*[+-]?\d+(?:\.\d*)?\s*          # AS VARCHAR(10), which
+          (?:,\s*[+-]?\d+(?:\.\d*)?\s*)?\))   # can't be a parameter
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<named>\?\d+|[:@$]\w+)
+    | (?P<placeholder>\?)
+    | (?P<by>\b(?:ORDER|GROUP)\s+BY\b)
+    | (?P<clause>\b(?:SELECT|FROM|WHERE|HAVING|LIMIT|OFFSET|UNION|EXCEPT
+                   |INTERSECT|WINDOW)\b|[();])
+    | (?P<number>(?<![\w.])(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?(?![\w.]))
+""", re.IGNORECASE | re.VERBOSE | re.DOTALL)
+_DML_RE = re.compile(
+    r"^\s*(?:SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH|VALUES)\b",
+    re.IGNORECASE)
+_MAX_INT = 2 ** 63 - 1
+
+
+@functools.lru_cache(maxsize=1024)
+def _template(sql):
+    """
+    (sql with literals turned into ?, slots, count of ? in the original)
+    where each slot is the index of a caller parameter or a one-element
+    tuple holding a literal value. None when the statement is left alone.
+    """
+    if not _DML_RE.match(sql):
+        return None  # PRAGMA, CREATE ... can't take parameters
+    parts, slots = [], []
+    position, given, in_by = 0, 0, False
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == "named":
+            return None
+        if kind == "placeholder":
+            slots.append(given)
+            given += 1
+            continue
+        if kind == "by":
+            in_by = True
+        elif kind == "clause":
+            in_by = False
+        if kind == "string":
+            value = text[1:-1].replace("''", "'")
+        elif kind == "number" and not in_by:
+            # ORDER BY 2 means the second column, not the constant 2
+            if re.fullmatch(r"\d+", text):
+                value = int(text)
+                if value > _MAX_INT:
+                    continue  # SQLite reads it as a REAL, Python can't bind it
+            else:
+                value = float(text)
+        else:
+            continue
+        parts.append(sql[position:match.start()])
+        parts.append("?")
+        position = match.end()
+        slots.append((value,))
+    if position == 0:
+        return None
+    parts.append(sql[position:])
+    return "".join(parts), tuple(slots), given
+
+
+def normalize(sql, params=()):
+    """
+    Replace string and number literals in a SELECT/INSERT/UPDATE/DELETE
+    with ? placeholders, so e.g. "... WHERE id = 1" and "... WHERE id = 2"
+    become one statement. Returns (sql, params); statements using named
+    or numbered parameters, a mapping of params, or the wrong number of
+    params, are returned as is.
+    """
+    if isinstance(params, dict):
+        return sql, params
+    template = _template(sql)
+    if template is None:
+        return sql, params
+    text, slots, given = template
+    params = tuple(params)
+    if len(params) != given:
+        return sql, params  # let sqlite3 report the binding mismatch
+    return text, tuple(slot[0] if type(slot) is tuple else params[slot]
+                        for slot in slots)
+
+
+class StatementStats:
+    """Statement cache hits and misses over every connection of a pool."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hit_rate()}
+
+
+class StatementCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        sql, parameters = self.connection._prepare(sql, parameters)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # One statement is already reused for every row; the parameter
+        # sets can't be merged with literals, so run the SQL as given
+        self.connection._track(sql)
+        return super().executemany(sql, seq_of_parameters)
+
+
+class StatementConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that optionally normalises ad-hoc SQL and counts
+    how often a statement is found in its statement cache. sqlite3 does
+    not expose that cache, so an LRU of the same size mirrors it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.normalize = False
+        self.stats = StatementStats()
+        self._statements = OrderedDict()
+        self._capacity = kwargs.get("cached_statements", 128)
+
+    def _prepare(self, sql, params):
+        if self.normalize:
+            sql, params = normalize(sql, params)
+        self._track(sql)
+        return sql, params
+
+    def _track(self, sql):
+        """Count a hit or miss for the SQL text about to run."""
+        if sql in self._statements:
+            self._statements.move_to_end(sql)
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+            self._statements[sql] = None
+            if len(self._statements) > self._capacity:
+                self._statements.popitem(last=False)
+
+    def cursor(self, factory=StatementCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of sqlite3 connections to one database file. Pooled
+    connections keep up to cached_statements prepared statements between
+    calls; normalize=True also rewrites literals into parameters (see
+    normalize) so equivalent queries reuse them.
+    """
+
+    def __init__(self, db_path='users.db', max_size=5, idle_timeout=300,
+                 pragmas=None, cached_statements=DEFAULT_CACHED_STATEMENTS,
+                 normalize=False):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self.cached_statements = cached_statements
+        self.normalize = normalize
+        self.stats = StatementStats()
+        self._idle = []  # (conn, last_used), most recently used last
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def _connect(self):
+        # Connections move between threads, but only one thread uses each
+        # at a time, so the same-thread check can be turned off
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=self.cached_statements,
+                               factory=StatementConnection)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        conn.normalize = self.normalize
+        conn.stats = self.stats
+        return conn
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.pop(0)
+            conn.close()
+            self._open -= 1
+
+    def acquire(self):
+        # A nested decorated call in the same thread reuses its connection
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+        with self._cond:
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    try:
+                        conn = self._connect()
+                    except Exception:
+                        self._open -= 1
+                        raise
+                    break
+                self._cond.wait()
+        self._local.held = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        self._local.held = None
+        if conn.in_transaction:
+            conn.rollback()  # uncommitted work is dropped, as with close()
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.close()
+            self._open -= len(self._idle)
+            self._idle = []
+
+    def statement_stats(self):
+        """Statement cache hits, misses and hit rate since the pool opened."""
+        return self.stats.as_dict()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_path, options):
+    """Hashable form of ConnectionPool's arguments, defaults filled in."""
+    bound = inspect.signature(ConnectionPool).bind(db_path, **options)
+    bound.apply_defaults()
+    return tuple(
+        (name, tuple(sorted(value.items())) if isinstance(value, dict)
+         else value)
+        for name, value in bound.arguments.items())
+
+
+def get_pool(db_path='users.db', **options):
+    """
+    Shared pool for db_path and `options`: callers asking for the same
+    settings share one pool, different settings (e.g. normalize=True or
+    another max_size) get their own.
+    """
+    key = _pool_key(db_path, options)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_path, **options)
+        return _pools[key]
+
+
+def with_pooled_connection(db_path='users.db', **options):
+    """
+    Like with_db_connection, but borrows the connection from a pool for
+    db_path (max_size, idle_timeout, pragmas, cached_statements and
+    normalize go to ConnectionPool).
+    """
+    def decorator(func):
+        pool = get_pool(db_path, **options)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = pool.acquire()
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                pool.release(conn)
+        return wrapper
+    return decorator
+
+
 @with_db_connection 
 def get_user_by_id(conn, user_id): 
     cursor = conn.cursor() 
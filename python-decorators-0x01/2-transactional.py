@@ -1,20 +1,164 @@
 import sqlite3 
 import functools
+import time
+from contextlib import contextmanager
+
+import query_events
+
+
+class _TransactionState:
+    """Per-connection bookkeeping while a transaction or batch is open."""
+
+    def __init__(self):
+        self.depth = 0
+        self.written = set()
+        self.batch = None
+
+
+class _Batch:
+    def __init__(self, conn, max_rows, max_latency, immediate):
+        self.max_rows = max_rows
+        self.max_latency = max_latency
+        self.immediate = immediate
+        self.reset(conn)
+
+    def reset(self, conn):
+        self.changes_at = conn.total_changes
+        self.pending_since = None
+
+    def due(self, conn):
+        if self.pending_since is None:
+            self.pending_since = time.monotonic()
+        return conn.total_changes - self.changes_at >= self.max_rows or \
+            time.monotonic() - self.pending_since >= self.max_latency
+
+
+# keyed by id(conn): sqlite3 connections can't be weakly referenced, so
+# entries are removed as soon as the connection's last transaction ends
+_states = {}
+
+
+def _enter(conn):
+    """State for conn, tracing the tables it writes while it exists."""
+    state = _states.get(id(conn))
+    if state is None:
+        state = _states[id(conn)] = _TransactionState()
+        # Record the tables written inside the transaction so cached reads
+        # of those tables can be dropped once it commits
+        conn.set_trace_callback(
+            lambda sql: state.written.update(query_events.tables_written(sql)))
+    return state
+
+
+def _leave(conn, state):
+    if state.depth == 0 and state.batch is None:
+        conn.set_trace_callback(None)
+        del _states[id(conn)]
+
+
+def _begin(conn, immediate):
+    # Explicit BEGIN so a SAVEPOINT inside can never become the outermost
+    # transaction (releasing that would commit)
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+
+def _commit(conn, state):
+    """Commit and return the tables written since the last commit."""
+    conn.commit()
+    written, state.written = state.written, set()
+    return written
+
 
 #### decorator to manage transactions
 """your code goes here"""
-def transactional(func):
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        try:
-            result = func(conn, *args, **kwargs)
-            conn.commit()
+def transactional(func=None, *, immediate=False):
+    """
+    Commit on success, roll back on error.
+    A decorated function called while another transactional call (or a
+    batched_commits block) is open on the same connection runs inside a
+    SAVEPOINT instead: its failure rolls back only its own work and it
+    never commits on its own. A batched_commits block opened inside a
+    transactional call joins that call's transaction. immediate=True
+    starts the outermost transaction with BEGIN IMMEDIATE, taking
+    SQLite's write lock up front rather than failing with "database is
+    locked" halfway through.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(conn, *args, **kwargs):
+            state = _enter(conn)
+            nested = state.depth > 0 or state.batch is not None
+            if nested:
+                if state.batch is not None and state.depth == 0:
+                    _begin(conn, immediate or state.batch.immediate)
+                savepoint = f"transactional_{state.depth}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+            else:
+                _begin(conn, immediate)
+            state.depth += 1
+            written = None
+            try:
+                result = func(conn, *args, **kwargs)
+                if nested:
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    written = _commit(conn, state)
+            except Exception as e:
+                if nested:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.rollback()
+                    state.written.clear()
+                print(f"Transaction failed unfortunately: {e}")
+                raise
+            finally:
+                state.depth -= 1
+                _leave(conn, state)
+            if state.depth == 0 and state.batch is not None and \
+                    state.batch.due(conn):
+                written = _commit(conn, state)
+                state.batch.reset(conn)
+            # Only once the commit is done: nothing a listener does can
+            # make a committed call look failed
+            if written:
+                query_events.notify_commit(written)
             return result
-        except Exception as e:
-            conn.rollback()
-            print(f"Transaction failed unfortunately: {e}")
-            raise
-    return wrapper
+        return wrapper
+    return decorator(func) if func is not None else decorator
+
+
+@contextmanager
+def batched_commits(conn, max_rows=1000, max_latency=1.0, immediate=False):
+    """
+    Group many transactional calls on conn into fewer commits.
+    Each call still succeeds or fails atomically (through a savepoint),
+    but the commit happens once max_rows rows have changed or
+    max_latency seconds have passed since the first uncommitted call,
+    and when the block ends.
+    """
+    state = _enter(conn)
+    if state.batch is not None or state.depth > 0:
+        # the enclosing batch or transactional call decides when (and
+        # whether) to commit
+        yield
+        return
+    state.batch = _Batch(conn, max_rows, max_latency, immediate)
+    try:
+        yield
+    finally:
+        # Every call that returned already succeeded on its own terms, so
+        # its work is kept even if the block exits with an exception
+        written = None
+        try:
+            if conn.in_transaction:
+                written = _commit(conn, state)
+        finally:
+            state.batch = None
+            _leave(conn, state)
+            if written:
+                query_events.notify_commit(written)
 
 #### paste your with_db_decorator here
 def with_db_connection(func):
@@ -29,8 +173,8 @@ def with_db_connection(func):
         return result 
     return wrapper
 
-@transactional 
 @with_db_connection
+@transactional 
 def update_user_email(conn, user_id, new_email): 
     cursor = conn.cursor() 
     cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id)) 
@@ -1,6 +1,9 @@
 import time
+import random
 import sqlite3 
+import asyncio
 import functools
+import threading
 
 #### paste your with_db_decorator here
 def with_db_connection(func):
@@ -16,23 +19,185 @@ def with_db_connection(func):
         return result 
     return wrapper
 
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failure_threshold` consecutive transient errors.
+    Once open, calls are rejected for `reset_timeout` seconds; then one
+    trial call is let through and its outcome closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout \
+                    or self._trial:
+                raise CircuitOpenError("circuit open: database unavailable")
+            self._trial = True  # half-open: let one call test the waters
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def release_trial(self):
+        """The call ended some other way; let the next one be the trial."""
+        with self._lock:
+            self._trial = False
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of calls so a struggling database isn't
+    hit with a multiple of its normal load: every call earns `ratio`
+    retry tokens, every retry spends one, and at most `max_tokens` are
+    banked.
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def backoff_delay(attempt, delay, max_delay, jitter=True):
+    """Exponential backoff for `attempt` (1-based), with full jitter."""
+    ceiling = min(max_delay, delay * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling) if jitter else ceiling
+
+
 #### decorator to retry on failure
 """ your code goes here"""
-def retry_on_failure(retries=3, delay=2):
+def retry_on_failure(retries=3, delay=2, max_delay=30, jitter=True,
+                     deadline=None, budget=None, breaker=None,
+                     exceptions=(sqlite3.OperationalError, ConnectionError)):
+    """
+    Retry transient errors with exponential backoff and full jitter.
+    deadline caps the total seconds spent across attempts, counted from
+    the first one (no retry starts past it; a running attempt isn't
+    interrupted), budget is a shared RetryBudget and breaker a shared
+    CircuitBreaker. Coroutine
+    functions are retried with asyncio.sleep instead of time.sleep.
+    """
+    def attempts(started):
+        """
+        Yield the pause before each retry; stop when retries run out.
+        `started` is when the first attempt began, so the deadline
+        covers it too.
+        """
+        for attempt in range(1, retries):
+            pause = backoff_delay(attempt, delay, max_delay, jitter)
+            if deadline is not None and \
+                    time.monotonic() - started + pause > deadline:
+                print("Retry deadline reached.")
+                return
+            if budget is not None and not budget.withdraw():
+                print("Retry budget exhausted.")
+                return
+            yield attempt, pause
+
+    def on_failure(e, attempt, pause):
+        # Catch only transient errors, not all exceptions
+        if breaker is not None:
+            breaker.record_failure()
+        print(f"Attempt {attempt} failed: {e}. "
+              f"Retrying in {pause:.2f} seconds...")
+
     def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if budget is not None:
+                    budget.deposit()
+                schedule = attempts(time.monotonic())
+                while True:
+                    if breaker is not None:
+                        breaker.before_call()
+                    try:
+                        result = await func(*args, **kwargs)
+                    except exceptions as e:
+                        step = next(schedule, None)
+                        if step is None:
+                            if breaker is not None:
+                                breaker.record_failure()
+                            print("All retry attempts failed.")
+                            raise
+                        on_failure(e, *step)
+                        await asyncio.sleep(step[1])
+                        continue
+                    except BaseException:
+                        # Not transient, or cancelled: it says nothing
+                        # about the database, so don't leave a half-open
+                        # breaker stuck
+                        if breaker is not None:
+                            breaker.release_trial()
+                        raise
+                    if breaker is not None:
+                        breaker.record_success()
+                    return result
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(1, retries + 1):
+            if budget is not None:
+                budget.deposit()
+            schedule = attempts(time.monotonic())
+            while True:
+                if breaker is not None:
+                    breaker.before_call()
                 try:
-                    return func(*args, **kwargs)
-                except (sqlite3.OperationalError, ConnectionError) as e:
-                    # Catch only transient errors, not all exceptions
-                    last_exception = e
-                    print(f"Attempt {attempt} failed: {e}. Retrying in {delay} seconds...")
-                    time.sleep(delay)
-            print("All retry attempts failed.")
-            raise last_exception
+                    result = func(*args, **kwargs)
+                except exceptions as e:
+                    step = next(schedule, None)
+                    if step is None:
+                        if breaker is not None:
+                            breaker.record_failure()
+                        print("All retry attempts failed.")
+                        raise
+                    on_failure(e, *step)
+                    time.sleep(step[1])
+                    continue
+                except BaseException:
+                    # Not transient, or cancelled: it says nothing about the
+                    # database, so don't leave a half-open breaker stuck
+                    if breaker is not None:
+                        breaker.release_trial()
+                    raise
+                if breaker is not None:
+                    breaker.record_success()
+                return result
         return wrapper
     return decorator
 
@@ -1,6 +1,15 @@
+import asyncio
+import os
+import sys
 import time
 import sqlite3 
 import functools
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import cache_backends
+import query_events
 
 
 #### paste your with_db_decorator here
@@ -17,21 +26,304 @@ def with_db_connection(func):
         return result 
     return wrapper
 
-query_cache = {}
+class QueryCache:
+    """
+    Bounded query result cache.
+    Entries expire after `ttl` seconds and the least recently used ones
+    are evicted once there are more than max_entries of them or their
+    approximate size passes max_bytes. Each entry remembers the tables
+    it read, and a commit through transactional that writes one of them
+    drops it.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (result, size, expires_at, tables read)
+        self._entries = OrderedDict()
+        self._by_table = {}  # table -> keys of entries that read it
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        query_events.add_commit_listener(self.invalidate_tables)
+
+    def get(self, key, tables=()):
+        """Return (True, result) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, result, ttl=None, tables=()):
+        size = approx_size(result)
+        if size > self.max_bytes:
+            return  # would evict everything else; don't cache it
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            tables = frozenset(tables)
+            self._entries[key] = (result, size, expires_at, tables)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or \
+                    self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table[table]
+            keys.discard(key)
+            if not keys:
+                del self._by_table[table]
+
+    def invalidate_tables(self, tables):
+        """Drop entries that read any of `tables`."""
+        with self._lock:
+            if query_events.ALL_TABLES in tables:
+                stale = set(self._entries)
+            else:
+                stale = set(self._by_table.get(query_events.ALL_TABLES, ()))
+                for table in tables:
+                    stale |= self._by_table.get(table, set())
+            for key in stale:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+def approx_size(result):
+    """Rough size in bytes of a fetchall()/fetchone() result."""
+    size = sys.getsizeof(result)
+    if isinstance(result, (list, tuple)):
+        for row in result:
+            size += sys.getsizeof(row)
+            if isinstance(row, (list, tuple)):
+                size += sum(sys.getsizeof(value) for value in row)
+    return size
+
+
+class _LeaderCancelled(Exception):
+    """The task running a single-flight call was cancelled."""
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+    The first caller runs the function; callers arriving while it runs
+    wait and receive the same result (or exception). Works for threads
+    via do() and for asyncio tasks via do_async().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> (done Event, outcome list)
+        self._tasks = {}  # (loop, key) -> Future
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = (threading.Event(), [])
+                self._calls[key] = call
+        done, outcome = call
+        if leader:
+            try:
+                outcome.append((True, fn()))
+            except BaseException as e:
+                outcome.append((False, e))
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                done.set()
+        else:
+            done.wait()
+        ok, value = outcome[0]
+        if not ok:
+            raise value
+        return value
+
+    async def do_async(self, key, coro_fn):
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        future = self._tasks.get(flight)
+        while future is not None:
+            try:
+                # shield: a cancelled follower must not cancel the shared call
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # The leader was cancelled, not us: the first follower to
+                # get here runs the call and the others wait for it
+                future = self._tasks.get(flight)
+        future = loop.create_future()
+        self._tasks[flight] = future
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else waits
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._tasks[flight]
+
+
+def cache_from_url(url):
+    """
+    memory:// for an in-process QueryCache, or a shared backend such as
+    sqlite:///query_cache.db or memcached://127.0.0.1:11211 so worker
+    processes and restarts see the same warm results.
+    """
+    if url.startswith("memory:"):
+        return QueryCache()
+    return cache_backends.backend_from_url(url)
+
+
+query_cache = cache_from_url(os.environ.get("QUERY_CACHE_URL", "memory://"))
+_flights = SingleFlight()
+
+
+def _cache_key(args, kwargs, db_path):
+    """(db_path, query, params) from a decorated call's arguments."""
+    positional = [a for a in args if not isinstance(a, sqlite3.Connection)]
+    query = kwargs.get('query', positional[0] if positional else None)
+    params = kwargs.get('params', positional[1] if len(positional) > 1 else ())
+    if isinstance(params, Mapping):
+        # named parameters: key on the values too, not just the names
+        params = tuple(sorted(params.items()))
+    return db_path, query, tuple(params)
+
+
 #### decorator to cache query results
 """your code goes here"""
-def cache_query(func):
-    @functools.wraps(func)
-    def wrapper(conn, query, *args, **kwargs):
-        if query in query_cache:
-            print("Using cached result for query.")
-            return query_cache[query]
-        
-        ### If no result then Execute the query and cache the result
-        result = func(conn, query, *args, **kwargs)
-        query_cache[query] = result
-        return result
-    return wrapper
+def cache_query(func=None, *, cache=None, ttl=None, db_path='users.db',
+                single_flight=False):
+    """
+    Cache results by (db_path, query, params).
+    Usable bare (@cache_query) or with options (@cache_query(ttl=60)).
+    The query and its bound parameters are read from the `query` and
+    `params` arguments, by keyword or position.
+    With single_flight=True, concurrent misses for the same key run the
+    query once and share the result. Coroutine functions are supported.
+    `cache` may be a QueryCache or any cache_backends backend; the
+    default comes from the QUERY_CACHE_URL environment variable.
+    Results of a query that overlapped a commit to a table it reads are
+    not cached. If the cache itself fails (e.g. memcached is down or the
+    SQLite cache stays locked), the query just runs uncached.
+    """
+    def decorator(func):
+        def lookup(key):
+            store = query_cache if cache is None else cache
+            tables = query_events.tables_read(key[1])
+            # Backends versioning entries by table fix the version now, so
+            # the put below can't file old rows under newer versions
+            versioned = getattr(store, "versioned_key", None)
+            try:
+                store_key = key if versioned is None \
+                    else versioned(key, tables)
+                hit, result = store.get(store_key, tables)
+            except Exception as e:
+                # A cache outage must not fail the query: run it uncached
+                print(f"Query cache unavailable: {e}")
+                return store, None, False, None
+            if hit:
+                print("Using cached result for query.")
+            return store, store_key, hit, result
+
+        def save(store, store_key, result, tables):
+            if store_key is None:
+                return  # the lookup failed; don't guess at a key
+            try:
+                store.put(store_key, result, ttl, tables)
+            except Exception as e:
+                print(f"Query cache unavailable: {e}")
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = _cache_key(args, kwargs, db_path)
+                store, store_key, hit, result = lookup(key)
+                if hit:
+                    return result
+
+                async def run():
+                    tables = query_events.tables_read(key[1])
+                    stamp = query_events.generation(tables)
+                    result = await func(*args, **kwargs)
+                    if query_events.generation(tables) == stamp:
+                        save(store, store_key, result, tables)
+                    return result
+                if single_flight:
+                    return await _flights.do_async(key, run)
+                return await run()
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _cache_key(args, kwargs, db_path)
+            store, store_key, hit, result = lookup(key)
+            if hit:
+                return result
+
+            ### If no result then Execute the query and cache the result
+            def run():
+                tables = query_events.tables_read(key[1])
+                stamp = query_events.generation(tables)
+                result = func(*args, **kwargs)
+                # A commit to a table it read landed while the query ran,
+                # so the result may predate it: return it, don't cache it
+                if query_events.generation(tables) == stamp:
+                    save(store, store_key, result, tables)
+                return result
+            if single_flight:
+                return _flights.do(key, run)
+            return run()
+        return wrapper
+    return decorator(func) if func is not None else decorator
 
 @cache_query
 @with_db_connection
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+"""
+Calls/sec of a get_user_by_id lookup with with_db_connection (a new
+sqlite3 connection per call) versus with_pooled_connection, then of the
+same lookup written as ad-hoc SQL with the id inlined, on a pool with and
+without literal normalisation (with its statement cache hit rate).
+
+Usage: python3 bench_connection.py [calls]
+Runs in a scratch directory with its own users.db.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+os.chdir(tempfile.mkdtemp())
+conn = sqlite3.connect('users.db')
+conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, "
+             "email TEXT, age INTEGER)")
+conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                 [(f"user{i}", f"user{i}@example.com", 20 + i % 60)
+                  for i in range(1000)])
+conn.commit()
+conn.close()
+
+sys.path.insert(0, HERE)
+db = __import__('1-with_db_connection')
+
+
+@db.with_db_connection
+def per_call(conn, user_id):
+    return conn.execute("SELECT * FROM users WHERE id = ?",
+                        (user_id,)).fetchone()
+
+
+@db.with_pooled_connection('users.db')
+def pooled(conn, user_id):
+    return conn.execute("SELECT * FROM users WHERE id = ?",
+                        (user_id,)).fetchone()
+
+
+def ad_hoc(pool):
+    def lookup(user_id):
+        conn = pool.acquire()
+        try:
+            return conn.execute(f"SELECT * FROM users WHERE id = {user_id}"
+                                ).fetchone()
+        finally:
+            pool.release(conn)
+    return lookup
+
+
+def run(label, func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(user_id=i % 1000 + 1)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {calls / elapsed:.0f} calls/sec")
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    run("with_db_connection", per_call, calls)
+    run("with_pooled_connection", pooled, calls)
+    for normalize in (False, True):
+        pool = db.ConnectionPool('users.db', normalize=normalize)
+        run(f"ad-hoc SQL, normalize={normalize}", ad_hoc(pool), calls)
+        print(f"    statement cache: {pool.statement_stats()}")
@@ -0,0 +1,359 @@
+import hashlib
+import math
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+import query_events
+
+#### shared result cache backends for cache_query
+# Every backend offers the same methods as QueryCache in 4-cache_query:
+# get(key, tables) -> (hit, result), put(key, result, ttl, tables),
+# invalidate_tables(tables), clear() and stats().
+# A backend may also offer versioned_key(key, tables): cache_query calls
+# it before running the query and uses the result for both get and put.
+# Results are pickled, so only point these at a cache you trust.
+
+PICKLE_PROTOCOL = max(5, pickle.DEFAULT_PROTOCOL)
+
+
+def dumps(result):
+    return pickle.dumps(result, protocol=PICKLE_PROTOCOL)
+
+
+def loads(data):
+    return pickle.loads(data)
+
+
+def digest(key):
+    """Stable text form of a (db_path, query, params) key."""
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """
+    Result cache in a local SQLite file, shared by every process that
+    opens the same path and surviving restarts. Expired entries are
+    skipped on read and the least recently used ones are evicted past
+    max_entries or max_bytes. A hit refreshes an entry's last use at most
+    once per touch_interval seconds, so reads rarely take the write lock.
+    """
+
+    def __init__(self, path='query_cache.db', max_entries=10000,
+                 max_bytes=256 * 1024 * 1024, ttl=300, touch_interval=30):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY, value BLOB, size INTEGER,
+                    expires_at REAL, last_used REAL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used "
+                         "ON entries (last_used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at "
+                         "ON entries (expires_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS deps (
+                    tbl TEXT, key TEXT, PRIMARY KEY (tbl, key)
+                ) WITHOUT ROWID""")
+            conn.execute("CREATE INDEX IF NOT EXISTS deps_key ON deps (key)")
+            # Running count and size of entries, kept by triggers so no
+            # write has to scan the table to enforce the limits
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    entries INTEGER, bytes INTEGER)""")
+            conn.execute("""
+                INSERT OR IGNORE INTO totals
+                SELECT 0, COUNT(*), TOTAL(size) FROM entries""")
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS entries_added
+                AFTER INSERT ON entries BEGIN
+                    UPDATE totals SET entries = entries + 1,
+                                      bytes = bytes + new.size;
+                END""")
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS entries_removed
+                AFTER DELETE ON entries BEGIN
+                    UPDATE totals SET entries = entries - 1,
+                                      bytes = bytes - old.size;
+                    DELETE FROM deps WHERE key = old.key;
+                END""")
+        query_events.add_commit_listener(self.invalidate_tables)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, tables=()):
+        conn = self._conn()
+        name = digest(key)
+        row = conn.execute("SELECT value, expires_at, last_used FROM entries "
+                           "WHERE key = ?", (name,)).fetchone()
+        now = time.time()
+        if row is None or row[1] < now:
+            self.misses += 1
+            return False, None
+        if now - row[2] > self.touch_interval:
+            with conn:
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?",
+                             (now, name))
+        self.hits += 1
+        return True, loads(row[0])
+
+    def put(self, key, result, ttl=None, tables=()):
+        data = dumps(result)
+        if len(data) > self.max_bytes:
+            return
+        name = digest(key)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        conn = self._conn()
+        with conn:
+            # DELETE then INSERT rather than INSERT OR REPLACE, so the
+            # triggers see the old entry go
+            conn.execute("DELETE FROM entries WHERE key = ?", (name,))
+            conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                         (name, data, len(data), expires_at, now))
+            conn.executemany("INSERT OR IGNORE INTO deps VALUES (?, ?)",
+                             [(table, name) for table in tables])
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+        count, size = conn.execute(
+            "SELECT entries, bytes FROM totals").fetchone()
+        while count > self.max_entries or size > self.max_bytes:
+            row = conn.execute("SELECT key, size FROM entries "
+                               "ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            count -= 1
+            size -= row[1]
+            self.evictions += 1
+
+    def invalidate_tables(self, tables):
+        conn = self._conn()
+        with conn:
+            if query_events.ALL_TABLES in tables:
+                removed = conn.execute("DELETE FROM entries").rowcount
+            else:
+                names = list(tables) + [query_events.ALL_TABLES]
+                marks = ", ".join("?" * len(names))
+                removed = conn.execute(
+                    f"DELETE FROM entries WHERE key IN "
+                    f"(SELECT key FROM deps WHERE tbl IN ({marks}))",
+                    names).rowcount
+        self.invalidations += removed
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        count, size = self._conn().execute(
+            "SELECT entries, bytes FROM totals").fetchone()
+        return {
+            "entries": count,
+            "bytes": int(size),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def _read_line(stream):
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("memcached closed the connection")
+    return line
+
+
+def _read_values(stream):
+    """Parse the VALUE ... END reply of a get into {key: data}."""
+    values = {}
+    while True:
+        header = _read_line(stream).rstrip(b"\r\n").split()
+        if header == [b"END"]:
+            return values
+        if not header or header[0] != b"VALUE":
+            raise OSError(f"Unexpected memcached reply: {header!r}")
+        length = int(header[3])
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("memcached closed the connection")
+        values[header[1].decode()] = data[:-2]
+
+
+class _VersionedKey(str):
+    """A memcached entry name already stamped with table versions."""
+
+
+class MemcachedBackend:
+    """
+    Result cache on any server speaking the memcached text protocol
+    (e.g. `memcached -p 11211` started locally). Eviction is left to the
+    server. Memcached can't list keys, so each table has a version
+    counter that is part of every key reading it; a commit bumps the
+    counters and older entries are simply never looked up again.
+    Entries whose tables couldn't be parsed depend on an epoch counter
+    bumped by every commit instead.
+    """
+
+    def __init__(self, host='127.0.0.1', port=11211, ttl=300, prefix='qc',
+                 timeout=2):
+        self.address = (host, port)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        query_events.add_commit_listener(self.invalidate_tables)
+
+    def _file(self):
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection(self.address, self.timeout)
+            stream = sock.makefile('rwb')
+            self._local.stream = stream
+        return stream
+
+    def _call(self, line, data=None, reply=None):
+        """
+        Send one command and read its reply. Any failure, including a
+        timeout half way through a reply, drops the connection: the
+        unread rest would otherwise be taken as the next command's reply.
+        """
+        stream = self._file()
+        try:
+            stream.write(line.encode() + b"\r\n")
+            if data is not None:
+                stream.write(data + b"\r\n")
+            stream.flush()
+            return (reply or _read_line)(stream)
+        except BaseException:
+            self._local.stream = None
+            stream.close()
+            raise
+
+    def _get_multi(self, keys):
+        return self._call("get " + " ".join(keys), reply=_read_values)
+
+    def _store(self, verb, key, data, ttl):
+        reply = self._call(f"{verb} {key} 0 {ttl} {len(data)}", data)
+        return reply.startswith(b"STORED")
+
+    def _set(self, key, data, ttl):
+        return self._store("set", key, data, ttl)
+
+    @staticmethod
+    def _seed():
+        # A version key evicted by the server restarts from a value no
+        # earlier entry was stamped with, rather than from 0
+        return str(time.time_ns()).encode()
+
+    def _version_key(self, table):
+        return f"{self.prefix}:v:{digest(table)}"
+
+    def _versions(self, names):
+        versions = self._get_multi(names)
+        missing = [name for name in names if name not in versions]
+        for name in missing:
+            seed = self._seed()
+            if self._store("add", name, seed, 0):
+                versions[name] = seed
+        if len(versions) < len(names):
+            # lost an add race to another client; use the value it stored
+            versions.update(self._get_multi(
+                [name for name in names if name not in versions]))
+        return [versions.get(name, b"").decode() for name in names]
+
+    def _entry_key(self, key, tables):
+        if query_events.ALL_TABLES in tables:
+            names = [f"{self.prefix}:epoch"]
+        else:
+            tables = sorted(set(tables) | {query_events.ALL_TABLES})
+            names = [self._version_key(table) for table in tables]
+        stamp = self._versions(names)
+        return f"{self.prefix}:e:{digest((key, names, stamp))}"
+
+    def versioned_key(self, key, tables=()):
+        """
+        `key` bound to the current versions of `tables`. Taken before the
+        query runs, so a put after a commit elsewhere (in any process)
+        lands under the old versions and is never served.
+        """
+        return _VersionedKey(self._entry_key(key, tables))
+
+    def _name(self, key, tables):
+        if isinstance(key, _VersionedKey):
+            return key
+        return self._entry_key(key, tables)
+
+    def get(self, key, tables=()):
+        name = self._name(key, tables)
+        data = self._get_multi([name]).get(name)
+        if data is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, loads(data)
+
+    def put(self, key, result, ttl=None, tables=()):
+        ttl = self.ttl if ttl is None else ttl
+        self._set(self._name(key, tables), dumps(result),
+                  max(1, math.ceil(ttl)))
+
+    def invalidate_tables(self, tables):
+        names = [self._version_key(table) for table in tables]
+        for name in names + [f"{self.prefix}:epoch"]:
+            if self._call(f"incr {name} 1").startswith(b"NOT_FOUND"):
+                self._set(name, self._seed(), 0)
+        self.invalidations += len(tables)
+
+    def clear(self):
+        self._call("flush_all")
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def backend_from_url(url, **options):
+    """
+    Build a backend from sqlite:///path/to/cache.db or
+    memcached://host:port.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        # sqlite:///cache.db is relative, sqlite:////tmp/cache.db absolute
+        return SQLiteCacheBackend(parsed.path[1:] or 'query_cache.db',
+                                  **options)
+    if parsed.scheme == "memcached":
+        return MemcachedBackend(parsed.hostname or '127.0.0.1',
+                                parsed.port or 11211, **options)
+    raise ValueError(f"Unknown cache backend: {url}")
@@ -0,0 +1,117 @@
+import re
+import threading
+import weakref
+
+#### which tables a SQL statement reads or writes, and commit notifications
+
+ALL_TABLES = "*"  # stands for "could be any table" when parsing fails
+
+_PART = r'[`"\[]?\w+[`"\]]?'
+_NAME = rf'(?:{_PART}\.)?{_PART}'
+_WRITE_RE = re.compile(
+    r'\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO'
+    r'|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM'
+    r'|(?:CREATE|DROP|ALTER)\s+TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)'
+    rf'\s+({_NAME})',
+    re.IGNORECASE
+)
+_WITH_RE = re.compile(r'^\s*WITH\b', re.IGNORECASE)
+_WRITE_VERBS = re.compile(
+    r'^\s*(?:WITH\b.*\b)?(?:INSERT|REPLACE|UPDATE|DELETE|CREATE|DROP|ALTER)\b',
+    re.IGNORECASE
+)
+_SOURCE_RE = re.compile(
+    r'\b(?:FROM|JOIN)\s+([^();]+?)'
+    r'(?=\b(?:WHERE|GROUP|ORDER|LIMIT|HAVING|UNION|EXCEPT|INTERSECT|ON'
+    r'|USING|JOIN|INNER|LEFT|RIGHT|CROSS|NATURAL|FULL|OUTER)\b|[();]|$)',
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def _table_name(token):
+    """Normalise `main."Users"` style names to users."""
+    name = token.strip('`"[] ').split('.')[-1]
+    return name.strip('`"[] ').lower()
+
+
+def tables_read(sql):
+    """
+    Tables a query reads from (FROM and JOIN clauses).
+    Returns {ALL_TABLES} when none can be found, so callers stay safe.
+    """
+    tables = set()
+    for clause in _SOURCE_RE.findall(sql):
+        for source in clause.split(','):
+            words = source.split()
+            if words and re.fullmatch(_NAME, words[0]):
+                tables.add(_table_name(words[0]))
+    return tables or {ALL_TABLES}
+
+
+def tables_written(sql):
+    """
+    Tables a statement modifies; empty for reads, {ALL_TABLES} for a
+    write whose target could not be parsed.
+    """
+    # A leading WITH clause may precede the write, so search past it
+    match = _WRITE_RE.search(sql) if _WITH_RE.match(sql) \
+        else _WRITE_RE.match(sql.lstrip())
+    if match:
+        return {_table_name(match.group(1))}
+    if _WRITE_VERBS.match(sql):
+        return {ALL_TABLES}
+    return set()
+
+
+_commit_listeners = []
+_generations = {}  # table -> number of commits that wrote it
+_commits = 0
+_generations_lock = threading.Lock()
+
+
+def add_commit_listener(listener):
+    """
+    Call listener(tables) after every commit made through transactional.
+    Bound methods are held weakly, so a registered cache can still be
+    garbage collected.
+    """
+    if hasattr(listener, '__self__'):
+        _commit_listeners.append(weakref.WeakMethod(listener))
+    else:
+        _commit_listeners.append(lambda: listener)
+
+
+def generation(tables):
+    """
+    Stamp that changes whenever a commit writes any of `tables`.
+    Take it before running a read and compare afterwards: if it moved,
+    a commit may have invalidated the result while the read was running.
+    """
+    if ALL_TABLES in tables:
+        return _commits
+    names = sorted(tables) + [ALL_TABLES]
+    return tuple(_generations.get(table, 0) for table in names)
+
+
+def notify_commit(tables):
+    """Tell every live listener which tables a commit wrote to."""
+    global _commits
+    if not tables:
+        return
+    # Bump generations first, so a read finishing during the listener
+    # calls below already sees that it overlapped this commit
+    with _generations_lock:
+        _commits += 1
+        for table in tables:
+            _generations[table] = _generations.get(table, 0) + 1
+    for ref in list(_commit_listeners):
+        listener = ref()
+        if listener is None:
+            _commit_listeners.remove(ref)
+            continue
+        try:
+            listener(set(tables))
+        except Exception as e:
+            # The commit has happened; a failing listener (e.g. a cache
+            # backend that is down) must not undo it or stop the others
+            print(f"Commit listener failed: {e}")
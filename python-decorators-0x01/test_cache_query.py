@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Unit tests for single-flight coalescing and invalidation in cache_query.
+
+4-cache_query runs its demo queries against users.db on import, so the
+module is loaded from a scratch directory holding a small users table.
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ORIGINAL_CWD = os.getcwd()
+cache_module = None
+
+
+def setUpModule() -> None:
+    """Create a scratch users.db and import 4-cache_query next to it."""
+    global cache_module
+    os.chdir(tempfile.mkdtemp())
+    conn = sqlite3.connect('users.db')
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+    conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+    conn.commit()
+    conn.close()
+    sys.path.insert(0, HERE)
+    cache_module = __import__('4-cache_query')
+
+
+def tearDownModule() -> None:
+    """Return to the directory the tests were started from."""
+    os.chdir(ORIGINAL_CWD)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Concurrent misses for one key must run the query only once."""
+
+    callers = 8
+
+    def test_threads_share_one_execution(self) -> None:
+        """N threads missing the same key trigger a single execution."""
+        executions = []
+        cache = cache_module.QueryCache()
+        start = threading.Barrier(self.callers)
+
+        @cache_module.cache_query(cache=cache, single_flight=True)
+        def fetch(query):
+            executions.append(query)
+            time.sleep(0.1)  # keep the flight open while others arrive
+            return [(1,)]
+
+        results = []
+
+        def call():
+            start.wait()
+            results.append(fetch(query="SELECT id FROM users"))
+
+        threads = [threading.Thread(target=call) for _ in range(self.callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(results, [[(1,)]] * self.callers)
+
+    def test_tasks_share_one_execution(self) -> None:
+        """N asyncio tasks missing the same key trigger a single execution."""
+        executions = []
+        cache = cache_module.QueryCache()
+
+        @cache_module.cache_query(cache=cache, single_flight=True)
+        async def fetch(query):
+            executions.append(query)
+            await asyncio.sleep(0.05)
+            return [(1,)]
+
+        async def run():
+            return await asyncio.gather(
+                *(fetch(query="SELECT id FROM users")
+                  for _ in range(self.callers)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(results, [[(1,)]] * self.callers)
+
+    def test_leader_cancellation_hands_over(self) -> None:
+        """Cancelling the leader lets a waiting task run the query instead."""
+        executions = []
+        cache = cache_module.QueryCache()
+
+        @cache_module.cache_query(cache=cache, single_flight=True)
+        async def fetch(query):
+            executions.append(query)
+            await asyncio.sleep(0.05)
+            return [(1,)]
+
+        async def run():
+            leader = asyncio.create_task(fetch(query="SELECT id FROM users"))
+            await asyncio.sleep(0)
+            followers = [asyncio.create_task(
+                fetch(query="SELECT id FROM users"))
+                for _ in range(self.callers - 1)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*followers)
+
+        results = asyncio.run(run())
+        self.assertEqual(len(executions), 2)
+        self.assertEqual(results, [[(1,)]] * (self.callers - 1))
+
+    def test_error_is_shared_and_not_cached(self) -> None:
+        """Waiters see the leader's exception and the next call retries."""
+        executions = []
+        cache = cache_module.QueryCache()
+
+        @cache_module.cache_query(cache=cache, single_flight=True)
+        def fetch(query):
+            executions.append(query)
+            raise sqlite3.OperationalError("database is locked")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            fetch(query="SELECT id FROM users")
+        with self.assertRaises(sqlite3.OperationalError):
+            fetch(query="SELECT id FROM users")
+        self.assertEqual(len(executions), 2)
+        self.assertEqual(len(cache), 0)
+
+
+class TestInvalidationRace(unittest.TestCase):
+    """A read overlapping a commit to its tables must not be cached."""
+
+    def test_commit_during_read_skips_put(self) -> None:
+        """The result is returned but the next call runs the query again."""
+        executions = []
+        cache = cache_module.QueryCache()
+
+        @cache_module.cache_query(cache=cache)
+        def fetch(query):
+            executions.append(query)
+            if len(executions) == 1:
+                # another connection commits an update while this one reads
+                cache_module.query_events.notify_commit({"users"})
+            return [(len(executions),)]
+
+        self.assertEqual(fetch(query="SELECT id FROM users"), [(1,)])
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(fetch(query="SELECT id FROM users"), [(2,)])
+        self.assertEqual(fetch(query="SELECT id FROM users"), [(2,)])
+        self.assertEqual(len(executions), 2)
+
+    def test_commit_to_other_table_still_caches(self) -> None:
+        """Commits to tables the query didn't read don't block caching."""
+        cache = cache_module.QueryCache()
+
+        @cache_module.cache_query(cache=cache)
+        def fetch(query):
+            cache_module.query_events.notify_commit({"orders"})
+            return [(1,)]
+
+        fetch(query="SELECT id FROM users")
+        self.assertEqual(len(cache), 1)
+
+
+class TestCacheKey(unittest.TestCase):
+    """Calls differing only in bound parameters must not share an entry."""
+
+    def test_named_params_keyed_by_value(self) -> None:
+        """{'id': 1} and {'id': 2} are different cache entries."""
+        cache = cache_module.QueryCache()
+
+        @cache_module.cache_query(cache=cache)
+        def fetch(query, params):
+            return [(params["id"],)]
+
+        query = "SELECT id FROM users WHERE id = :id"
+        self.assertEqual(fetch(query, {"id": 1}), [(1,)])
+        self.assertEqual(fetch(query, {"id": 2}), [(2,)])
+        self.assertEqual(len(cache), 2)
+
+
+class BrokenCache:
+    """Backend whose server is unreachable."""
+
+    def get(self, key, tables=()):
+        raise ConnectionRefusedError("cache down")
+
+    def put(self, key, result, ttl=None, tables=()):
+        raise ConnectionRefusedError("cache down")
+
+
+class TestCacheOutage(unittest.TestCase):
+    """A failing cache backend degrades to running the query uncached."""
+
+    def test_backend_errors_are_misses(self) -> None:
+        """Every call runs the query and returns its rows."""
+        executions = []
+
+        @cache_module.cache_query(cache=BrokenCache())
+        def fetch(query):
+            executions.append(query)
+            return [(1,)]
+
+        self.assertEqual(fetch(query="SELECT id FROM users"), [(1,)])
+        self.assertEqual(fetch(query="SELECT id FROM users"), [(1,)])
+        self.assertEqual(len(executions), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
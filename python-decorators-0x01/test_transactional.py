@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Unit tests for savepoints, batched commits and commit notification in
+2-transactional.
+
+The module updates a user in users.db on import, so it is loaded from a
+scratch directory holding a small users table.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ORIGINAL_CWD = os.getcwd()
+tx = None
+
+
+def setUpModule() -> None:
+    """Create a scratch users.db and import 2-transactional next to it."""
+    global tx
+    os.chdir(tempfile.mkdtemp())
+    conn = sqlite3.connect('users.db')
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+    conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+    conn.commit()
+    conn.close()
+    sys.path.insert(0, HERE)
+    tx = __import__('2-transactional')
+
+
+def tearDownModule() -> None:
+    """Return to the directory the tests were started from."""
+    os.chdir(ORIGINAL_CWD)
+
+
+class TransactionalTestCase(unittest.TestCase):
+    """Each test writes to its own table through its own connection."""
+
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect('users.db')
+        self.addCleanup(self.conn.close)
+        self.conn.execute("DROP TABLE IF EXISTS items")
+        self.conn.execute("CREATE TABLE items (n INTEGER)")
+        self.conn.commit()
+
+        @tx.transactional
+        def insert(conn, n):
+            conn.execute("INSERT INTO items VALUES (?)", (n,))
+            if n < 0:
+                raise ValueError("negative")
+        self.insert = insert
+
+    def committed(self):
+        """Rows visible to another connection, i.e. actually committed."""
+        other = sqlite3.connect('users.db')
+        try:
+            return [n for (n,) in other.execute(
+                "SELECT n FROM items ORDER BY rowid")]
+        finally:
+            other.close()
+
+
+class TestSavepoints(TransactionalTestCase):
+    """Nested calls roll back on their own and never commit on their own."""
+
+    def test_inner_failure_keeps_outer_work(self) -> None:
+        """A failed nested call undoes only its own insert."""
+        @tx.transactional
+        def outer(conn):
+            self.insert(conn, 1)
+            with self.assertRaises(ValueError):
+                self.insert(conn, -1)
+            self.insert(conn, 2)
+
+        outer(self.conn)
+        self.assertEqual(self.committed(), [1, 2])
+        self.assertFalse(self.conn.in_transaction)
+
+    def test_outer_failure_undoes_inner_work(self) -> None:
+        """Nested work that succeeded is rolled back with the outer call."""
+        @tx.transactional
+        def outer(conn):
+            self.insert(conn, 1)
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            outer(self.conn)
+        self.assertEqual(self.committed(), [])
+
+
+class TestBatchedCommits(TransactionalTestCase):
+    """Batches commit every max_rows rows and when the block ends."""
+
+    def test_commits_every_max_rows(self) -> None:
+        """Rows become visible in groups; a failed call is dropped alone."""
+        seen = []
+        with tx.batched_commits(self.conn, max_rows=3, max_latency=60):
+            for n in (1, 2, -3, 4, 5, 6):
+                try:
+                    self.insert(self.conn, n)
+                except ValueError:
+                    pass
+                seen.append(len(self.committed()))
+        # 1, 2 and the rolled-back -3 count as 3 changes: 4 commits them
+        self.assertEqual(seen, [0, 0, 0, 3, 3, 3])
+        self.assertEqual(self.committed(), [1, 2, 4, 5, 6])
+
+    def test_batch_inside_transaction_defers_to_it(self) -> None:
+        """A batch opened in a transactional call can't commit it early."""
+        @tx.transactional
+        def outer(conn):
+            self.insert(conn, 1)
+            with tx.batched_commits(conn, max_rows=1):
+                for n in (2, 3, 4):
+                    self.insert(conn, n)
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            outer(self.conn)
+        self.assertEqual(self.committed(), [])
+
+
+class TestCommitListeners(TransactionalTestCase):
+    """Listeners run after the commit and can't turn it into a failure."""
+
+    def test_failing_listener_does_not_fail_the_call(self) -> None:
+        """The write is committed and the caller sees success."""
+        notified = []
+
+        def broken(tables):
+            notified.append(tables)
+            raise OSError("cache down")
+
+        tx.query_events.add_commit_listener(broken)
+        self.addCleanup(tx.query_events._commit_listeners.pop)
+        self.insert(self.conn, 1)
+        self.assertEqual(self.committed(), [1])
+        self.assertEqual(notified, [{"items"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Unit tests for SQL normalisation and statement tracking in
+1-with_db_connection.
+
+The module looks a user up in users.db on import, so it is loaded from
+a scratch directory holding a small users table.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ORIGINAL_CWD = os.getcwd()
+db_module = None
+
+
+def setUpModule() -> None:
+    """Create a scratch users.db and import 1-with_db_connection next to it."""
+    global db_module
+    os.chdir(tempfile.mkdtemp())
+    conn = sqlite3.connect('users.db')
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, "
+                 "email TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                     [("Ann", "ann@example.com", 31),
+                      ("O'Brien", "ob@example.com", 45),
+                      ("Cy", "cy@example.com", 27)])
+    conn.commit()
+    conn.close()
+    sys.path.insert(0, HERE)
+    db_module = __import__('1-with_db_connection')
+
+
+def tearDownModule() -> None:
+    """Return to the directory the tests were started from."""
+    os.chdir(ORIGINAL_CWD)
+
+
+class TestNormalize(unittest.TestCase):
+    """Literals become parameters without changing what a query returns."""
+
+    def assertSameResult(self, sql, params=()) -> None:
+        """normalize(sql) must run and return what sql itself returns."""
+        conn = sqlite3.connect('users.db')
+        self.addCleanup(conn.close)
+        text, values = db_module.normalize(sql, params)
+        self.assertEqual(conn.execute(text, values).fetchall(),
+                         conn.execute(sql, params).fetchall())
+
+    def test_literals_become_parameters(self) -> None:
+        """Numbers and strings are moved into the parameters, in order."""
+        self.assertEqual(
+            db_module.normalize(
+                "SELECT * FROM users WHERE age > 30 AND name = 'Ann'"),
+            ("SELECT * FROM users WHERE age > ? AND name = ?", (30, "Ann")))
+
+    def test_quoted_strings(self) -> None:
+        """Escaped quotes are unescaped; quoted identifiers are kept."""
+        sql = ("SELECT \"name\", x'00' FROM users "
+               "WHERE name = 'O''Brien' -- id = 1")
+        self.assertEqual(
+            db_module.normalize(sql),
+            ("SELECT \"name\", x'00' FROM users WHERE name = ? -- id = 1",
+             ("O'Brien",)))
+        self.assertSameResult(sql)
+
+    def test_mixed_with_placeholders(self) -> None:
+        """Existing ? parameters keep their place among the literals."""
+        sql = "SELECT id FROM users WHERE age > ? AND id < 3 AND name != ?"
+        self.assertEqual(
+            db_module.normalize(sql, (20, "Cy")),
+            ("SELECT id FROM users WHERE age > ? AND id < ? AND name != ?",
+             (20, 3, "Cy")))
+        self.assertSameResult(sql, (20, "Cy"))
+
+    def test_order_by_positions_kept(self) -> None:
+        """ORDER BY 2 is a column position, not a value."""
+        sql = ("SELECT name, age FROM users WHERE age > 20 "
+               "ORDER BY 2, 1 LIMIT 2")
+        self.assertEqual(
+            db_module.normalize(sql),
+            ("SELECT name, age FROM users WHERE age > ? ORDER BY 2, 1 "
+             "LIMIT ?", (20, 2)))
+        self.assertSameResult(sql)
+
+    def test_cast_type_sizes_kept(self) -> None:
+        """A type's size in CAST can't be a parameter."""
+        sql = ("SELECT CAST(age AS VARCHAR(10)), CAST(age AS DECIMAL(5, 2)) "
+               "FROM users WHERE id = 1")
+        text, values = db_module.normalize(sql)
+        self.assertIn("VARCHAR(10)", text)
+        self.assertIn("DECIMAL(5, 2)", text)
+        self.assertEqual(values, (1,))
+        self.assertSameResult(sql)
+
+    def test_left_alone(self) -> None:
+        """Named params, mappings, wrong counts and non-DML are untouched."""
+        cases = [
+            ("SELECT * FROM users WHERE id = :id AND age > 1", {"id": 1}),
+            ("SELECT * FROM users WHERE id = ?1 AND age > 1", (1,)),
+            ("SELECT * FROM users WHERE id = ? AND age > 1", ()),
+            ("PRAGMA cache_size = 100", ()),
+        ]
+        for sql, params in cases:
+            with self.subTest(sql=sql):
+                self.assertEqual(db_module.normalize(sql, params),
+                                 (sql, params))
+
+
+class TestStatementConnection(unittest.TestCase):
+    """Pooled connections count statement cache hits on the SQL they run."""
+
+    def setUp(self) -> None:
+        self.pool = db_module.ConnectionPool('users.db', normalize=True,
+                                             pragmas={})
+        self.conn = self.pool.acquire()
+        self.addCleanup(self.pool.close)
+        self.addCleanup(self.pool.release, self.conn)
+
+    def test_equivalent_queries_hit(self) -> None:
+        """Queries differing only in literals share one statement."""
+        for user_id in (1, 2, 3):
+            self.conn.execute(f"SELECT name FROM users WHERE id = {user_id}")
+        self.assertEqual(self.pool.statement_stats()["hits"], 2)
+        self.assertEqual(self.pool.statement_stats()["misses"], 1)
+
+    def test_executemany_runs_sql_as_given(self) -> None:
+        """Literals next to ? in executemany are neither moved nor lost."""
+        sql = "INSERT INTO users (name, email, age) VALUES (?, ?, 30)"
+        rows = [("Di", "di@example.com"), ("Ed", "ed@example.com")]
+        self.conn.executemany(sql, rows)
+        self.conn.cursor().executemany(sql, rows)
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM users WHERE age = 30").fetchone(), (4,))
+        self.assertEqual(self.pool.statement_stats()["hits"], 1)
+        self.assertIn(sql, self.conn._statements)
+        self.conn.rollback()
+
+
+class TestGetPool(unittest.TestCase):
+    """Pools are shared only between callers asking for the same settings."""
+
+    def test_same_settings_share_a_pool(self) -> None:
+        """Spelling out a default doesn't create a second pool."""
+        self.assertIs(db_module.get_pool('users.db'),
+                      db_module.get_pool('users.db', max_size=5))
+
+    def test_different_settings_get_their_own_pool(self) -> None:
+        """normalize=True isn't dropped because a plain pool exists."""
+        plain = db_module.get_pool('users.db')
+        normalizing = db_module.get_pool('users.db', normalize=True)
+        self.assertIsNot(plain, normalizing)
+        self.assertTrue(normalizing.normalize)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,28 +1,61 @@
-import mysql.connector
 from mysql.connector import Error
 
-def stream_users():
-    """Generator that yields rows from the user_data table one by one"""
+import db_pool
+from user_row import UserRow
+
+def stream_users(buffered=False, prefetch=1000, compact=False):
+    """
+    Generator that yields rows from the user_data table one by one.
+    By default the cursor is unbuffered, so rows stay on the server and are
+    pulled `prefetch` at a time with fetchmany. Pass buffered=True for the
+    old behaviour of reading the whole result set up front.
+    With compact=True rows are yielded as UserRow objects instead of dicts.
+    The cursor and connection are released even if the consumer stops early.
+    """
+    connection = None
+    cursor = None
+    exhausted = False
     try:
-        # Connect to the ALX_prodev database
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword",   # replace with your real password
-            database="ALX_prodev"
-        )
+        # Borrow a pooled connection to the ALX_prodev database
+        connection = db_pool.get_connection()
 
         if connection.is_connected():
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_data;")
-
-            # yield each row one by one
-            for row in cursor:
-                yield row
+            cursor = connection.cursor(dictionary=not compact,
+                                       buffered=buffered)
+            cursor.execute("SELECT user_id, name, email, age FROM user_data;")
 
-            cursor.close()
-            connection.close()
+            # yield each row one by one, fetching `prefetch` rows per round trip
+            while True:
+                rows = cursor.fetchmany(prefetch)
+                if not rows:
+                    break
+                for row in rows:
+                    yield UserRow.from_row(row) if compact else row
+            exhausted = True
 
     except Error as e:
         print(f"Error: {e}")
         return
+
+    finally:
+        _close(connection, cursor, exhausted or buffered)
+
+
+def _close(connection, cursor, drained):
+    """Release cursor and connection, even with unread rows on the wire."""
+    try:
+        if cursor is not None and drained:
+            cursor.close()
+    except Error:
+        pass
+    finally:
+        if connection is not None:
+            # A connection with rows still streaming can't be reused, so
+            # discard it; dropping it is much cheaper than reading to the end
+            try:
+                if drained:
+                    connection.close()
+                else:
+                    getattr(connection, "discard", connection.close)()
+            except Error:
+                pass
@@ -1,42 +1,254 @@
-import mysql.connector
+import math
+import queue
+from array import array
+from collections import deque
+from functools import partial
+from itertools import compress
+from multiprocessing import Pool, cpu_count
+
 from mysql.connector import Error
 
-def stream_users_in_batches(batch_size):
-    """Generator that yields users in batches from the user_data table"""
+import db_pool
+from user_row import UserRow
+
+try:
+    import numpy as np
+except ImportError:  # columnar batches fall back to array/list columns
+    np = None
+
+
+def _to_columns(names, rows):
+    """Transpose a list of row tuples into {column: values}."""
+    columns = {}
+    for name, values in zip(names, zip(*rows)):
+        if name == "age":
+            ages = map(int, values)
+            if np is not None:
+                columns[name] = np.fromiter(ages, dtype=np.int16,
+                                            count=len(rows))
+            else:
+                columns[name] = array('h', ages)
+        elif np is not None:
+            columns[name] = np.array(values, dtype=object)
+        else:
+            columns[name] = list(values)
+    return columns
+
+
+def stream_users_in_batches(batch_size, columnar=False, compact=False,
+                            raise_errors=False):
+    """
+    Generator that yields users in batches from the user_data table.
+    Each batch is a list of row dicts (UserRow objects with compact=True),
+    or with columnar=True a dict of column name -> NumPy array
+    (array/list without NumPy).
+    Database errors are printed and end the stream, unless raise_errors
+    is set: callers that must not mistake a dropped connection for the
+    end of the table (e.g. export_users) get the exception instead.
+    """
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword",  # replace with your password
-            database="ALX_prodev"
-        )
+        connection = db_pool.get_connection()
 
         if connection.is_connected():
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM user_data;")
+            cursor = connection.cursor(dictionary=not (columnar or compact))
+            cursor.execute("SELECT user_id, name, email, age FROM user_data;")
 
-            batch = []
-            for row in cursor:
-                batch.append(row)
-                if len(batch) == batch_size:
-                    yield batch
-                    batch = []  # reset batch after yielding
+            if columnar:
+                names = cursor.column_names
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield _to_columns(names, rows)
+            else:
+                batch = []
+                for row in cursor:
+                    batch.append(UserRow.from_row(row) if compact else row)
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []  # reset batch after yielding
 
-            # yield any remaining rows
-            if batch:
-                yield batch
+                # yield any remaining rows
+                if batch:
+                    yield batch
 
             cursor.close()
             connection.close()
 
     except Error as e:
+        if raise_errors:
+            raise
         print(f"Error: {e}")
         return
 
 
-def batch_processing(batch_size):
+def _age_over(threshold, batch):
+    ages = batch["age"]
+    if np is not None and isinstance(ages, np.ndarray):
+        return ages > threshold
+    if isinstance(ages, (array, list)):
+        return [age > threshold for age in ages]
+    return int(ages) > threshold
+
+
+def age_over(threshold):
+    """
+    Predicate keeping users older than threshold.
+    Works on a row dict (returns a bool) or on a columnar batch
+    (returns a boolean mask). The predicate is picklable, so it can be
+    handed to parallel_batch_processing workers.
+    """
+    return partial(_age_over, threshold)
+
+
+def filter_columns(columns, mask, projection=None):
+    """Apply a boolean mask (and optional column projection) to a batch."""
+    names = projection or list(columns)
+    if np is not None and isinstance(mask, np.ndarray):
+        return {name: columns[name][mask] for name in names}
+    return {name: list(compress(columns[name], mask)) for name in names}
+
+
+def iter_rows(columns):
+    """Turn a columnar batch back into row dicts."""
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def processed_batches(batch_size, predicate=None, projection=None,
+                      columnar=False):
+    """
+    Yield each batch filtered by predicate (default: age > 25) and
+    reduced to the projected columns.
+    """
+    predicate = predicate or age_over(25)
+    for batch in stream_users_in_batches(batch_size, columnar=columnar):
+        if columnar:
+            yield filter_columns(batch, predicate(batch), projection)
+        else:
+            yield [
+                {k: user[k] for k in projection} if projection else user
+                for user in batch if predicate(user)
+            ]
+
+
+def batch_processing(batch_size, predicate=None, projection=None,
+                     columnar=False):
     """Process each batch to filter users over age 25"""
-    for batch in stream_users_in_batches(batch_size):
-        processed = [user for user in batch if int(user["age"]) > 25]
+    for processed in processed_batches(batch_size, predicate, projection,
+                                       columnar):
+        if columnar:
+            processed = iter_rows(processed)
         for user in processed:
             print(user)
+
+
+def key_ranges(partitions):
+    """
+    Split the user_id key space into `partitions` contiguous ranges.
+    user_id is a random UUID, so equal slices of its leading 32 bits hold
+    roughly equal numbers of rows. Returns [(low, high), ...] where None
+    means unbounded.
+    """
+    span = 16 ** 8
+    bounds = [f"{i * span // partitions:08x}" for i in range(1, partitions)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def _filter_range(key_range, batch_size, predicate):
+    """Worker: stream one key range on its own connection and filter it."""
+    low, high = key_range
+    clauses = []
+    params = []
+    if low is not None:
+        clauses.append("user_id >= %s")
+        params.append(low)
+    if high is not None:
+        clauses.append("user_id < %s")
+        params.append(high)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    connection = db_pool.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"SELECT * FROM user_data{where} ORDER BY user_id;",
+                       params)
+        kept = []
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            kept.extend(user for user in batch if predicate(user))
+        cursor.close()
+        return kept
+    finally:
+        connection.close()
+
+
+def _estimated_rows():
+    """InnoDB's row estimate for user_data (no full COUNT(*) scan)."""
+    connection = db_pool.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT TABLE_ROWS FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'
+        """)
+        row = cursor.fetchone()
+        cursor.close()
+        return int(row[0] or 0) if row else 0
+    finally:
+        connection.close()
+
+
+def parallel_batch_processing(batch_size, workers=None, predicate=None,
+                              ordered=True, partitions_per_worker=4,
+                              range_rows=100000):
+    """
+    Filter user_data across worker processes.
+    The table is split into primary-key ranges of about range_rows rows
+    (at least partitions_per_worker per worker), each worker streams its
+    range through its own connection, and the filtered users of each
+    range are yielded as a list - in key order when ordered=True,
+    otherwise as soon as each range finishes. At most two ranges per
+    worker are in flight, so neither side holds more than a few
+    range_rows-sized lists however large the table is.
+    """
+    workers = workers or cpu_count()
+    predicate = predicate or age_over(25)
+    partitions = max(workers * partitions_per_worker,
+                     math.ceil(_estimated_rows() / range_rows))
+    ranges = key_ranges(partitions)
+    task = partial(_filter_range, batch_size=batch_size, predicate=predicate)
+    in_flight = workers * 2
+    with Pool(workers) as pool:
+        if ordered:
+            pending = deque()
+            for key_range in ranges:
+                pending.append(pool.apply_async(task, (key_range,)))
+                if len(pending) >= in_flight:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+            return
+
+        done = queue.Queue()
+
+        def next_done():
+            kept = done.get()
+            if isinstance(kept, BaseException):
+                raise kept
+            return kept
+
+        outstanding = 0
+        for key_range in ranges:
+            pool.apply_async(task, (key_range,), callback=done.put,
+                             error_callback=done.put)
+            outstanding += 1
+            if outstanding >= in_flight:
+                yield next_done()
+                outstanding -= 1
+        while outstanding:
+            yield next_done()
+            outstanding -= 1
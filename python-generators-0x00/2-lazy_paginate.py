@@ -1,29 +1,168 @@
+import base64
+import json
+import queue
+import threading
+import time
+
 import seed
 
 
 def paginate_users(page_size, offset):
     """
-    Fetch a page of users from the database.
+    Fetch a page of users from the database using LIMIT/OFFSET.
+    Kept for callers that need random access to a page; lazy_pagination
+    seeks on the primary key instead.
     """
     connection = seed.connect_to_prodev()
     cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+    cursor.execute(
+        "SELECT * FROM user_data ORDER BY user_id LIMIT %s OFFSET %s",
+        (page_size, offset)
+    )
     rows = cursor.fetchall()
     cursor.close()
     connection.close()
     return rows
 
 
-def lazy_pagination(page_size):
+def fetch_page(connection, page_size, after=None):
+    """
+    Fetch the page_size users whose user_id sorts after `after`.
+    Seeking on the primary key costs the same for every page,
+    unlike OFFSET which scans and discards all earlier rows.
+    """
+    cursor = connection.cursor(dictionary=True)
+    if after is None:
+        cursor.execute(
+            "SELECT * FROM user_data ORDER BY user_id LIMIT %s",
+            (page_size,)
+        )
+    else:
+        cursor.execute(
+            "SELECT * FROM user_data WHERE user_id > %s "
+            "ORDER BY user_id LIMIT %s",
+            (after, page_size)
+        )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def encode_cursor(user_id):
+    """Opaque resume token for the page ending at user_id."""
+    payload = json.dumps({"after": user_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; returns the user_id to seek after."""
+    if not token:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(token.encode()))["after"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Invalid pagination cursor: {token!r}")
+
+
+def next_cursor(page):
+    """Resume token for the page after `page` (None for an empty page)."""
+    return encode_cursor(page[-1]["user_id"]) if page else None
+
+
+def _record(stats, key, seconds):
+    if stats is not None:
+        stats[key] = stats.get(key, 0.0) + seconds
+
+
+def lazy_pagination(page_size, cursor=None, prefetch=0, stats=None):
     """
-    Generator that lazily paginates through user_data, 
+    Generator that lazily paginates through user_data,
     fetching the next page only when needed.
-    Uses only one loop and yields page by page.
-    """
-    offset = 0
-    while True:
-        page = paginate_users(page_size, offset)
-        if not page:
-            break  # stop if no more results
-        yield page
-        offset += page_size
+    Uses only one loop and yields page by page over a single connection.
+    Pass a token from next_cursor() to resume after a previous page,
+    even from another process.
+    With prefetch=K a background thread keeps up to K pages ready while
+    the caller processes the current one. If a `stats` dict is given it
+    is filled with pages, db_wait_seconds and processing_seconds.
+    """
+    after = decode_cursor(cursor)
+    if prefetch > 0:
+        pages = _prefetched_pages(page_size, after, prefetch)
+    else:
+        pages = _pages(page_size, after)
+    try:
+        while True:
+            started = time.perf_counter()
+            page = next(pages, None)
+            _record(stats, "db_wait_seconds", time.perf_counter() - started)
+            if page is None:
+                break  # stop if no more results
+            if stats is not None:
+                stats["pages"] = stats.get("pages", 0) + 1
+            started = time.perf_counter()
+            yield page
+            _record(stats, "processing_seconds", time.perf_counter() - started)
+    finally:
+        pages.close()
+
+
+def _pages(page_size, after):
+    """Fetch pages in the caller's thread, one round trip per page."""
+    connection = seed.connect_to_prodev()
+    try:
+        while True:
+            page = fetch_page(connection, page_size, after)
+            if not page:
+                return
+            yield page
+            after = page[-1]["user_id"]
+    finally:
+        connection.close()
+
+
+_DONE = object()
+
+
+def _prefetched_pages(page_size, after, prefetch):
+    """
+    Fetch pages on a background thread into a queue bounded to
+    `prefetch` pages, so a slow consumer applies backpressure.
+    """
+    pages = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        # Whatever ends the thread, the consumer must get an item that
+        # ends its pages.get() wait: _DONE or the error to re-raise
+        outcome = _DONE
+        try:
+            for page in _pages(page_size, after):
+                if not put(page):
+                    return
+        except BaseException as e:
+            outcome = e
+        finally:
+            put(outcome)
+
+    worker = threading.Thread(target=producer, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join()
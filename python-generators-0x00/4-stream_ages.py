@@ -1,3 +1,5 @@
+import math
+
 import seed
 
 
@@ -15,18 +17,200 @@ def stream_user_ages():
     connection.close()
 
 
-def calculate_average_age():
+def _query(sql, params=()):
+    """Run an aggregate query on ALX_prodev and return all rows."""
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    connection.close()
+    return rows
+
+
+def age_stats():
+    """
+    Count, sum, mean, min, max and population variance of age,
+    computed by the database in a single aggregate query.
+    """
+    ((count, total, mean, low, high, variance),) = _query(
+        "SELECT COUNT(age), SUM(age), AVG(age), MIN(age), MAX(age), "
+        "VAR_POP(age) FROM user_data"
+    )
+    return {
+        "count": count,
+        "sum": float(total or 0),
+        "mean": float(mean or 0),
+        "min": low,
+        "max": high,
+        "variance": float(variance or 0),
+    }
+
+
+def age_histogram(bucket_width=10):
+    """
+    Number of users per age bucket, grouped in the database.
+    Returns {bucket_start: count} ordered by bucket.
+    """
+    rows = _query(
+        "SELECT FLOOR(age / %s) * %s AS bucket, COUNT(*) FROM user_data "
+        "GROUP BY bucket ORDER BY bucket",
+        (bucket_width, bucket_width)
+    )
+    return {int(bucket): count for bucket, count in rows}
+
+
+def age_percentiles(percentiles=(0.5, 0.9, 0.99)):
+    """
+    Exact age percentiles (nearest rank).
+    Age is a small integer, so the database returns at most a few hundred
+    (age, count) groups and the ranks are resolved from those counts.
+    """
+    counts = age_histogram(bucket_width=1)
+    total = sum(counts.values())
+    result = {}
+    for p in percentiles:
+        rank = max(1, math.ceil(p * total))
+        seen = 0
+        for age, count in counts.items():
+            seen += count
+            if seen >= rank:
+                result[p] = age
+                break
+    return result
+
+
+class P2Quantile:
     """
-    Uses the generator to compute the average age 
-    without loading all rows into memory.
+    P-square estimator (Jain & Chlamtac) for a single quantile p.
+    Tracks five markers, so memory stays constant however many values
+    are added.
     """
-    total = 0
-    count = 0
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []
+        self.n = [0, 1, 2, 3, 4]
+        self.np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.dn = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+
+        for i in range(1, 4):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or \
+                    (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if q[i - 1] < candidate < q[i + 1]:
+                    q[i] = candidate
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.q, self.n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self):
+        if not self.q:
+            return None
+        if len(self.q) < 5:
+            # Too few values for the markers; use the exact nearest rank
+            rank = max(1, math.ceil(self.p * len(self.q)))
+            return self.q[rank - 1]
+        return self.q[2]
+
+
+class StreamingStats:
+    """
+    Single-pass accumulator for values that cannot be aggregated in SQL:
+    count, sum, min/max, Welford mean/variance, fixed-width histogram
+    and P-square percentile estimates, all in constant memory.
+    """
+
+    def __init__(self, percentiles=(0.5, 0.9, 0.99), bucket_width=10):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.bucket_width = bucket_width
+        self.histogram = {}
+        self.quantiles = {p: P2Quantile(p) for p in percentiles}
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        bucket = int(value // self.bucket_width) * self.bucket_width
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+        for estimator in self.quantiles.values():
+            estimator.add(value)
+
+    def result(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "variance": self.m2 / self.count if self.count else 0.0,
+            "histogram": dict(sorted(self.histogram.items())),
+            "percentiles": {p: e.value() for p, e in self.quantiles.items()},
+        }
+
+
+def streaming_age_stats(percentiles=(0.5, 0.9, 0.99), bucket_width=10):
+    """Fallback: compute age statistics from stream_user_ages in one pass."""
+    stats = StreamingStats(percentiles, bucket_width)
     for age in stream_user_ages():
-        total += age
-        count += 1
+        stats.add(age)
+    return stats.result()
+
 
-    average_age = total / count if count > 0 else 0
+def calculate_average_age(push_down=True):
+    """
+    Compute the average age without loading all rows into memory.
+    By default the database computes AVG(age); with push_down=False
+    the ages are streamed and averaged in Python.
+    """
+    if push_down:
+        average_age = age_stats()["mean"]
+    else:
+        total = 0
+        count = 0
+        for age in stream_user_ages():
+            total += age
+            count += 1
+        average_age = total / count if count > 0 else 0
     print(f"Average age of users: {average_age:.2f}")
 
 
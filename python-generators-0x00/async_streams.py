@@ -0,0 +1,131 @@
+import asyncio
+
+import aiomysql
+
+import db_pool
+
+lazy_paginate = __import__('2-lazy_paginate')
+
+_pools = {}
+
+
+async def get_async_pool():
+    """
+    aiomysql pool for the running event loop, configured from the same
+    MYSQL_* environment variables as db_pool.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        config = db_pool.config_from_env()
+        pool = await aiomysql.create_pool(
+            host=config["host"],
+            port=config["port"],
+            user=config["user"],
+            password=config["password"],
+            db=config["database"],
+            maxsize=max(config["pool_size"], 1),
+            pool_recycle=int(config["max_lifetime"]),
+            autocommit=True,
+        )
+        _pools[loop] = pool
+    return pool
+
+
+async def close_async_pool():
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def _stream(sql, params=(), cursor_class=aiomysql.SSDictCursor,
+                  prefetch=1000):
+    """
+    Yield lists of up to `prefetch` rows from a server-side cursor.
+    If the consumer stops early or is cancelled, the connection still has
+    rows on the wire, so it is closed instead of going back to the pool.
+    The cursor is only closed after a full read: closing an unbuffered
+    cursor reads the rest of the result first.
+    """
+    pool = await get_async_pool()
+    conn = await pool.acquire()
+    drained = False
+    try:
+        cursor = await conn.cursor(cursor_class)
+        await cursor.execute(sql, params)
+        while True:
+            rows = await cursor.fetchmany(prefetch)
+            if not rows:
+                break
+            yield rows
+        await cursor.close()
+        drained = True
+    finally:
+        if not drained:
+            conn.close()
+        pool.release(conn)
+
+
+async def async_stream_users(prefetch=1000):
+    """
+    Async generator that yields rows from the user_data table one by one.
+    Wrap it in contextlib.aclosing() when breaking out early so the
+    connection is released straight away.
+    """
+    rows = _stream("SELECT user_id, name, email, age FROM user_data",
+                   prefetch=prefetch)
+    try:
+        async for batch in rows:
+            for row in batch:
+                yield row
+    finally:
+        await rows.aclose()
+
+
+async def async_stream_users_in_batches(batch_size):
+    """Async generator that yields users in batches of batch_size."""
+    rows = _stream("SELECT user_id, name, email, age FROM user_data",
+                   prefetch=batch_size)
+    try:
+        async for batch in rows:
+            yield batch
+    finally:
+        await rows.aclose()
+
+
+async def async_lazy_pagination(page_size, cursor=None):
+    """
+    Async generator over user_data pages, seeking on user_id like
+    lazy_pagination and accepting the same resume tokens.
+    """
+    after = lazy_paginate.decode_cursor(cursor)
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        while True:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                if after is None:
+                    await cur.execute(
+                        "SELECT * FROM user_data ORDER BY user_id LIMIT %s",
+                        (page_size,))
+                else:
+                    await cur.execute(
+                        "SELECT * FROM user_data WHERE user_id > %s "
+                        "ORDER BY user_id LIMIT %s",
+                        (after, page_size))
+                page = await cur.fetchall()
+            if not page:
+                break  # stop if no more results
+            yield page
+            after = page[-1]["user_id"]
+
+
+async def async_stream_user_ages():
+    """Async generator that yields user ages one by one."""
+    rows = _stream("SELECT age FROM user_data", cursor_class=aiomysql.SSCursor)
+    try:
+        async for batch in rows:
+            for (age,) in batch:
+                yield age
+    finally:
+        await rows.aclose()
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+"""
+Run many user streams concurrently on one event loop.
+
+Usage: python3 bench_async.py [streams] [rows_per_stream]
+Starts `streams` async_stream_users readers (default 50), each taking
+`rows_per_stream` rows (default 10,000), and prints total rows/sec.
+Set MYSQL_POOL_SIZE to at least `streams` so no reader waits for a
+connection.
+"""
+import asyncio
+import sys
+import time
+from contextlib import aclosing
+
+import async_streams
+
+
+async def read(rows):
+    count = 0
+    async with aclosing(async_streams.async_stream_users()) as users:
+        async for _ in users:
+            count += 1
+            if count == rows:
+                break
+    return count
+
+
+async def main(streams, rows):
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(read(rows) for _ in range(streams)))
+    elapsed = time.perf_counter() - start
+    total = sum(counts)
+    print(f"{streams} concurrent streams: {total} rows in {elapsed:.2f}s, "
+          f"{total / elapsed:.0f} rows/sec on one thread")
+    await async_streams.close_async_pool()
+
+
+if __name__ == "__main__":
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    asyncio.run(main(streams, rows))
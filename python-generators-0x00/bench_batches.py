@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+"""
+Compare dict batches against columnar batches for the age > 25 filter.
+
+Usage: python3 bench_batches.py [batch_size]
+Runs processed_batches over the whole user_data table in both modes and
+prints rows/sec for each, then times parallel_batch_processing with an
+increasing number of worker processes.
+"""
+import os
+import sys
+import time
+
+processing = __import__('1-batch_processing')
+
+
+def run(batch_size, columnar):
+    rows = 0
+    kept = 0
+    start = time.perf_counter()
+    for batch in processing.stream_users_in_batches(batch_size, columnar):
+        if columnar:
+            mask = processing.age_over(25)(batch)
+            kept += len(processing.filter_columns(batch, mask)["age"])
+            rows += len(batch["age"])
+        else:
+            kept += sum(1 for user in batch if int(user["age"]) > 25)
+            rows += len(batch)
+    elapsed = time.perf_counter() - start
+    mode = "columnar" if columnar else "dict"
+    print(f"{mode}: {rows} rows ({kept} kept) in {elapsed:.2f}s, "
+          f"{rows / elapsed:.0f} rows/sec")
+    return rows
+
+
+def run_parallel(batch_size, workers, rows):
+    start = time.perf_counter()
+    kept = sum(len(users) for users in processing.parallel_batch_processing(
+        batch_size, workers=workers, ordered=False))
+    elapsed = time.perf_counter() - start
+    print(f"parallel x{workers}: {kept} kept in {elapsed:.2f}s, "
+          f"{rows / elapsed:.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rows = run(batch_size, columnar=False)
+    run(batch_size, columnar=True)
+    workers = 1
+    while workers <= os.cpu_count():
+        run_parallel(batch_size, workers, rows)
+        workers *= 2
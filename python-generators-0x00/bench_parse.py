@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+"""
+Compare single-process CSV parsing against csv_parser.parse_parallel.
+
+Usage: python3 bench_parse.py [rows] [workers]
+Generates a CSV of `rows` users (default 30,000,000, roughly 1.5 GB)
+and parses it both ways without touching the database, printing MB/s
+and rows/sec for each.
+"""
+import os
+import sys
+import time
+
+import csv_parser
+import seed
+from bench_seed import generate_csv
+
+
+def report(label, rows, size, elapsed):
+    print(f"{label}: {rows} rows in {elapsed:.2f}s, "
+          f"{size / (1024 * 1024) / elapsed:.1f} MB/s, "
+          f"{rows / elapsed:.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 30_000_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    path = f"bench_users_{rows}.csv"
+    if not os.path.exists(path):
+        generate_csv(path, rows)
+    size = os.path.getsize(path)
+
+    start = time.perf_counter()
+    count = sum(1 for _ in seed.read_csv_rows(path))
+    report("single process", count, size, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    count = sum(len(parsed) for _, parsed, _ in
+                csv_parser.parse_parallel(path, workers))
+    report(f"{workers} workers", count, size, time.perf_counter() - start)
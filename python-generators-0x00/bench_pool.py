@@ -0,0 +1,32 @@
+#!/usr/bin/python3
+"""
+Measure connect overhead when paginating with and without the pool.
+
+Usage: python3 bench_pool.py [pages] [page_size]
+paginate_users borrows a connection for every page, so it is run once
+with pooling disabled (a fresh connect per page) and once pooled.
+"""
+import sys
+import time
+
+import db_pool
+
+paginate = __import__('2-lazy_paginate')
+
+
+def run(pages, page_size, pool_size):
+    db_pool.configure_pool(size=pool_size)
+    start = time.perf_counter()
+    for page in range(pages):
+        paginate.paginate_users(page_size, page * page_size)
+    elapsed = time.perf_counter() - start
+    mode = f"pool of {pool_size}" if pool_size else "no pool"
+    print(f"{mode}: {pages} pages in {elapsed:.2f}s, "
+          f"{elapsed / pages * 1000:.2f} ms/page")
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    run(pages, page_size, pool_size=0)
+    run(pages, page_size, pool_size=5)
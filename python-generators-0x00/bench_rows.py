@@ -0,0 +1,29 @@
+#!/usr/bin/python3
+"""
+Compare the memory cost of dict rows against compact UserRow objects.
+
+Usage: python3 bench_rows.py [rows]
+Keeps the first `rows` users (default 100,000) from stream_users in a list
+for each representation and prints the bytes allocated per row.
+"""
+import sys
+import tracemalloc
+from itertools import islice
+
+stream_users = __import__('0-stream_users').stream_users
+
+
+def bytes_per_row(rows, compact):
+    tracemalloc.start()
+    kept = list(islice(stream_users(compact=compact), rows))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / max(len(kept), 1)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    as_dict = bytes_per_row(rows, compact=False)
+    as_row = bytes_per_row(rows, compact=True)
+    print(f"dict:    {as_dict:.0f} bytes/row")
+    print(f"UserRow: {as_row:.0f} bytes/row ({as_dict / as_row:.1f}x smaller)")
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+Compare the per-row seed.insert_data path against seed.bulk_insert_data.
+
+Usage: python3 bench_seed.py [rows]
+Generates a CSV of `rows` users (default 1,000,000) and loads it twice
+into a freshly truncated user_data table.
+"""
+import csv
+import random
+import sys
+import time
+
+import seed
+
+
+def generate_csv(path, rows):
+    """Write `rows` fake users to path in the user_data.csv format."""
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file, quoting=csv.QUOTE_ALL)
+        writer.writerow(["name", "email", "age"])
+        for i in range(rows):
+            writer.writerow([f"User {i}", f"user{i}@example.com",
+                             random.randint(1, 120)])
+
+
+def truncate(connection):
+    cursor = connection.cursor()
+    cursor.execute("TRUNCATE TABLE user_data;")
+    connection.commit()
+    cursor.close()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = f"bench_users_{rows}.csv"
+    generate_csv(path, rows)
+
+    connection = seed.connect_to_prodev()
+    if connection:
+        seed.create_table(connection)
+
+        truncate(connection)
+        start = time.perf_counter()
+        seed.insert_data(connection, path)
+        elapsed = time.perf_counter() - start
+        print(f"per-row insert: {rows / elapsed:.0f} rows/sec")
+
+        truncate(connection)
+        seed.bulk_insert_data(connection, path)
+
+        truncate(connection)
+        connection.close()
@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+"""
+Show that stream_users keeps RSS flat while streaming a large table.
+
+Usage: python3 bench_stream.py [rows] [buffered]
+Seeds user_data up to `rows` users (default 5,000,000) and streams it,
+printing resident memory every 500,000 rows. Pass "buffered" as the
+second argument to compare against a buffered cursor; run each mode in
+its own process so the numbers don't mix.
+"""
+import os
+import sys
+
+import seed
+from bench_seed import generate_csv
+
+stream_users = __import__('0-stream_users').stream_users
+
+
+def rss_mb():
+    """Current resident set size in MB (Linux)."""
+    with open("/proc/self/statm") as file:
+        pages = int(file.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def ensure_rows(rows):
+    connection = seed.connect_to_prodev()
+    seed.create_table(connection)
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data;")
+    (count,) = cursor.fetchone()
+    cursor.close()
+    if count < rows:
+        path = f"bench_users_{rows}.csv"
+        generate_csv(path, rows)
+        seed.bulk_insert_data(connection, path)
+    connection.close()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    buffered = len(sys.argv) > 2 and sys.argv[2] == "buffered"
+    ensure_rows(rows)
+
+    print(f"start: {rss_mb():.1f} MB (buffered={buffered})")
+    for i, _ in enumerate(stream_users(buffered=buffered), 1):
+        if i % 500_000 == 0:
+            print(f"{i} rows: {rss_mb():.1f} MB")
+    print(f"end: {rss_mb():.1f} MB")
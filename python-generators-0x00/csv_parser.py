@@ -0,0 +1,122 @@
+import csv
+import io
+import mmap
+import os
+import re
+from multiprocessing import Pool, cpu_count
+
+import seed
+
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+MIN_AGE = 0
+MAX_AGE = 150
+
+
+def _record_end(data, start, target):
+    """
+    Offset just past the first newline at or after `target` that ends a
+    record, for a record boundary at `start`. A newline preceded by an
+    odd number of quotes since `start` is inside a quoted field (escaped
+    quotes come in pairs), so it is skipped.
+    """
+    quotes = data[start:target].count(b'"')
+    while True:
+        newline = data.find(b"\n", target)
+        if newline == -1:
+            return len(data)
+        quotes += data[target:newline + 1].count(b'"')
+        target = newline + 1
+        if quotes % 2 == 0:
+            return target
+
+
+def split_ranges(csv_file, chunk_bytes=32 * 1024 * 1024, start_offset=0):
+    """
+    Split csv_file into (start, end) byte ranges of about chunk_bytes,
+    each ending just after a record so no row straddles two ranges, even
+    one with newlines inside quoted fields.
+    The header is skipped; start_offset (a range end from an earlier
+    run) resumes part way through.
+    """
+    size = os.path.getsize(csv_file)
+    if size == 0:
+        return []
+    with open(csv_file, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = max(_record_end(data, 0, 0), start_offset)
+        ranges = []
+        while start < size:
+            end = _record_end(data, start,
+                              min(start + chunk_bytes, size) - 1)
+            ranges.append((start, end))
+            start = end
+        return ranges
+
+
+def validate(name, email, age):
+    """Return (name, email, int age), or None if the row is invalid."""
+    email = email.strip()
+    if not name.strip() or not EMAIL_RE.match(email):
+        return None
+    try:
+        age = int(age)
+    except ValueError:
+        return None
+    if not MIN_AGE <= age <= MAX_AGE:
+        return None
+    return name, email, age
+
+
+def header_positions(csv_file):
+    """Indexes of the name, email and age columns in csv_file's header."""
+    with open(csv_file, 'r', newline='') as file:
+        header = next(csv.reader(file))
+    return tuple(header.index(column) for column in ("name", "email", "age"))
+
+
+def parse_range(csv_file, byte_range, positions=(0, 1, 2)):
+    """
+    Worker: parse one byte range of csv_file into upsert-ready tuples.
+    positions gives the name, email and age column indexes.
+    Returns (end_offset, rows, rejected).
+    """
+    start, end = byte_range
+    with open(csv_file, 'rb') as file, \
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        text = data[start:end].decode('utf-8')
+    rows = []
+    rejected = 0
+    for fields in csv.reader(io.StringIO(text, newline='')):
+        if not fields:
+            continue
+        try:
+            valid = validate(*(fields[i] for i in positions))
+        except IndexError:
+            valid = None
+        if valid is None:
+            rejected += 1
+            continue
+        name, email, age = valid
+        rows.append((seed.user_id_for(email), name, email, age))
+    return end, rows, rejected
+
+
+def parse_parallel(csv_file, workers=None, chunk_bytes=32 * 1024 * 1024,
+                   start_offset=0):
+    """
+    Parse csv_file on a process pool, yielding (end_offset, rows, rejected)
+    per byte range in file order. Only `workers` ranges are parsed ahead
+    of the consumer at a time.
+    """
+    workers = workers or cpu_count()
+    positions = header_positions(csv_file)
+    ranges = split_ranges(csv_file, chunk_bytes, start_offset)
+    with Pool(workers) as pool:
+        pending = []
+        for byte_range in ranges:
+            pending.append(pool.apply_async(
+                parse_range, (csv_file, byte_range, positions)))
+            if len(pending) > workers:
+                yield pending.pop(0).get()
+        for result in pending:
+            yield result.get()
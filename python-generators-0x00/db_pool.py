@@ -0,0 +1,199 @@
+import os
+import queue
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import Error
+
+
+def config_from_env():
+    """
+    MySQL settings for the generator modules, read from the environment:
+    MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE,
+    MYSQL_POOL_SIZE (0 disables pooling) and MYSQL_POOL_MAX_LIFETIME
+    (seconds a connection may be reused before it is replaced).
+    """
+    return {
+        "host": os.environ.get("MYSQL_HOST", "localhost"),
+        "port": int(os.environ.get("MYSQL_PORT", 3306)),
+        "user": os.environ.get("MYSQL_USER", "root"),
+        "password": os.environ.get("MYSQL_PASSWORD", "yourpassword"),
+        "database": os.environ.get("MYSQL_DATABASE", "ALX_prodev"),
+        "pool_size": int(os.environ.get("MYSQL_POOL_SIZE", 5)),
+        "max_lifetime": float(os.environ.get("MYSQL_POOL_MAX_LIFETIME", 1800)),
+    }
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled MySQL connection.
+    close() hands the connection back to the pool instead of closing it;
+    discard() really closes it (use it when unread rows are pending).
+    Everything else is delegated to the underlying connection.
+    """
+
+    def __init__(self, pool, connection, created):
+        self._pool = pool
+        self._connection = connection
+        self._created = created
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise Error("Connection already returned to the pool")
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            self._pool._release(self._connection, self._created)
+            self._connection = None
+
+    def discard(self):
+        if self._connection is not None:
+            self._pool._discard(self._connection)
+            self._connection = None
+
+    def __del__(self):
+        # A borrower that never closed its connection must not leak a slot
+        try:
+            self.discard()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections.
+    Connections are checked with a ping on checkout, replaced once they
+    are older than max_lifetime, and at most `size` are open at once;
+    get_connection() blocks when all of them are in use.
+    """
+
+    def __init__(self, size=5, max_lifetime=1800, **connect_args):
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.connect_args = connect_args
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        return mysql.connector.connect(**self.connect_args), time.monotonic()
+
+    def _healthy(self, connection, created):
+        if time.monotonic() - created > self.max_lifetime:
+            return False
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def get_connection(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise Error("Timed out waiting for a pooled connection")
+        try:
+            while True:
+                try:
+                    connection, created = self._idle.get_nowait()
+                except queue.Empty:
+                    connection, created = self._connect()
+                    break
+                if self._healthy(connection, created):
+                    break
+                self._close_quietly(connection)
+        except Exception:
+            self._slots.release()
+            raise
+        return PooledConnection(self, connection, created)
+
+    def _release(self, connection, created):
+        try:
+            # Clear any open transaction before the next borrower sees it
+            connection.rollback()
+            self._idle.put((connection, created))
+        except Error:
+            self._close_quietly(connection)
+        finally:
+            self._slots.release()
+
+    def _discard(self, connection):
+        self._close_quietly(connection)
+        self._slots.release()
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def close_all(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close_quietly(connection)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    The process-wide pool, created from config_from_env() on first use.
+    A forked worker process gets its own pool rather than sharing the
+    parent's sockets. Returns None when MYSQL_POOL_SIZE is 0.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool_pid != os.getpid():
+            config = config_from_env()
+            size = config.pop("pool_size")
+            max_lifetime = config.pop("max_lifetime")
+            _pool = ConnectionPool(size, max_lifetime, **config) \
+                if size > 0 else None
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def configure_pool(size=None, max_lifetime=None, **connect_args):
+    """Replace the process-wide pool; size=0 turns pooling off."""
+    global _pool, _pool_pid
+    config = config_from_env()
+    config.update(connect_args)
+    default_size = config.pop("pool_size")
+    default_lifetime = config.pop("max_lifetime")
+    size = default_size if size is None else size
+    max_lifetime = default_lifetime if max_lifetime is None else max_lifetime
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close_all()
+        _pool = ConnectionPool(size, max_lifetime, **config) \
+            if size > 0 else None
+        _pool_pid = os.getpid()
+
+
+def get_connection(database=True):
+    """
+    Borrow a connection to ALX_prodev (or to the bare server with
+    database=False, which is never pooled). Call close() to give it back.
+    """
+    if database:
+        pool = get_pool()
+        if pool is not None:
+            return pool.get_connection()
+    config = config_from_env()
+    config.pop("pool_size")
+    config.pop("max_lifetime")
+    if not database:
+        config.pop("database")
+    return mysql.connector.connect(**config)
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+"""
+Export user_data to NDJSON, Parquet or Arrow IPC shards.
+
+Usage: python3 export_users.py OUT_DIR [--format ndjson|parquet|arrow]
+           [--batch-size N] [--shard-mb MB] [--compression CODEC]
+
+Rows are read with stream_users_in_batches and written one batch at a
+time, so memory stays bounded by the batch size. A new shard is started
+once the current file reaches --shard-mb. Parquet and Arrow need pyarrow.
+A database error aborts the export instead of leaving truncated shards
+that look complete.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from decimal import Decimal
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # only the ndjson format is available without pyarrow
+    pa = None
+
+processing = __import__('1-batch_processing')
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() \
+            else float(value)
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+
+class NdjsonShard:
+    """One NDJSON file, gzip-compressed unless compression is 'none'."""
+
+    def __init__(self, path, compression):
+        self.path = path
+        self.raw = open(path, "wb")
+        self.file = gzip.GzipFile(fileobj=self.raw, mode="wb") \
+            if compression != "none" else self.raw
+
+    def write(self, batch):
+        lines = "".join(json.dumps(user, default=_json_default) + "\n"
+                        for user in batch)
+        self.file.write(lines.encode())
+
+    def size(self):
+        return self.raw.tell()
+
+    def close(self):
+        if self.file is not self.raw:
+            self.file.close()
+        self.raw.close()
+
+
+def _arrow_table(batch):
+    return pa.table({
+        "user_id": [user["user_id"] for user in batch],
+        "name": [user["name"] for user in batch],
+        "email": [user["email"] for user in batch],
+        "age": pa.array([int(user["age"]) for user in batch], pa.int16()),
+    })
+
+
+class ParquetShard:
+    """One Parquet file; each batch becomes a row group."""
+
+    def __init__(self, path, compression):
+        self.path = path
+        self.writer = None
+        self.compression = None if compression == "none" else compression
+
+    def write(self, batch):
+        table = _arrow_table(batch)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(
+                self.path, table.schema, compression=self.compression)
+        self.writer.write_table(table)
+
+    def size(self):
+        return os.path.getsize(self.path) if self.writer else 0
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ArrowShard:
+    """One Arrow IPC file; each batch becomes a record batch."""
+
+    def __init__(self, path, compression):
+        self.path = path
+        self.sink = pa.OSFile(path, "wb")
+        self.writer = None
+        self.compression = None if compression == "none" else compression
+
+    def write(self, batch):
+        table = _arrow_table(batch)
+        if self.writer is None:
+            options = pyarrow.ipc.IpcWriteOptions(compression=self.compression)
+            self.writer = pyarrow.ipc.new_file(self.sink, table.schema,
+                                               options=options)
+        self.writer.write_table(table)
+
+    def size(self):
+        return self.sink.tell()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.sink.close()
+
+
+SHARDS = {"ndjson": NdjsonShard, "parquet": ParquetShard, "arrow": ArrowShard}
+
+
+def export_users(out_dir, fmt="ndjson", batch_size=10000, shard_mb=256,
+                 compression=None):
+    """
+    Stream user_data into size-bounded shards under out_dir.
+    Default compression is gzip for NDJSON and zstd for Parquet/Arrow.
+    Returns the list of shard paths written.
+    """
+    if fmt not in SHARDS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt != "ndjson" and pa is None:
+        raise RuntimeError(f"pyarrow is required for the {fmt} format")
+    if compression is None:
+        compression = "gzip" if fmt == "ndjson" else "zstd"
+    extension = fmt
+    if fmt == "ndjson" and compression != "none":
+        extension += ".gz"
+    os.makedirs(out_dir, exist_ok=True)
+
+    shard_limit = shard_mb * 1024 * 1024
+    paths = []
+    shard = None
+    rows = 0
+    written = 0
+    start = time.perf_counter()
+    try:
+        for batch in processing.stream_users_in_batches(
+                batch_size, raise_errors=True):
+            if shard is None:
+                path = os.path.join(
+                    out_dir, f"user_data-{len(paths):05d}.{extension}")
+                shard = SHARDS[fmt](path, compression)
+                paths.append(path)
+            shard.write(batch)
+            rows += len(batch)
+            if shard.size() >= shard_limit:
+                shard.close()
+                written += os.path.getsize(shard.path)
+                shard = None
+    finally:
+        if shard is not None:
+            shard.close()
+            written += os.path.getsize(shard.path)
+
+    elapsed = time.perf_counter() - start
+    mb = written / (1024 * 1024)
+    rate = mb / elapsed if elapsed > 0 else 0
+    print(f"Exported {rows} rows to {len(paths)} shard(s), {mb:.1f} MB "
+          f"in {elapsed:.2f}s ({rate:.1f} MB/s).")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export user_data")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", choices=sorted(SHARDS), default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--shard-mb", type=int, default=256)
+    parser.add_argument("--compression", default=None,
+                        help="gzip/none for ndjson; zstd/snappy/lz4/none "
+                             "for parquet and arrow")
+    args = parser.parse_args()
+    export_users(args.out_dir, args.format, args.batch_size, args.shard_mb,
+                 args.compression)
@@ -0,0 +1,152 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+_MAP = "map"
+_FILTER = "filter"
+
+
+class Pipeline:
+    """
+    Lazy, single-pass pipeline over any iterable of rows.
+
+        users().filter(lambda u: u["age"] > 25).map(str.upper).batch(100)
+
+    Nothing runs until the pipeline is iterated. Consecutive map/filter
+    stages are fused into one loop, and batch/window hold at most one
+    batch or window, so no stage builds an intermediate list of the
+    whole stream.
+    """
+
+    def __init__(self, source, stages=()):
+        self._source = source
+        self._stages = tuple(stages)
+
+    def _then(self, stage):
+        return Pipeline(self._source, self._stages + (stage,))
+
+    def map(self, fn):
+        return self._then((_MAP, fn))
+
+    def filter(self, predicate):
+        return self._then((_FILTER, predicate))
+
+    def batch(self, size):
+        """Group items into lists of `size` (the last one may be shorter)."""
+        return self._then((_batch, size))
+
+    def window(self, size, step=1):
+        """
+        Sliding windows of `size` items as tuples, advancing `step` items
+        at a time (step=size gives non-overlapping windows).
+        """
+        if size < 1 or step < 1:
+            raise ValueError("window size and step must be at least 1")
+        return self._then((_window, size, step))
+
+    def parallel_map(self, fn, workers=4, processes=False, in_flight=None):
+        """
+        Apply fn on a thread (or process) pool, keeping output order.
+        At most `in_flight` items (default 4 per worker) are submitted
+        ahead of the consumer, so the stream is never drained eagerly.
+        fn must be picklable when processes=True.
+        """
+        return self._then((_parallel_map, fn, workers, processes,
+                           in_flight or workers * 4))
+
+    def take(self, n):
+        return self._then((_take, n))
+
+    def __iter__(self):
+        items = iter(self._source)
+        fused = []
+        for stage in self._stages:
+            if stage[0] in (_MAP, _FILTER):
+                fused.append(stage)
+                continue
+            if fused:
+                items = _fuse(items, fused)
+                fused = []
+            items = stage[0](items, *stage[1:])
+        if fused:
+            items = _fuse(items, fused)
+        return items
+
+    def reduce(self, fn, initial):
+        result = initial
+        for item in self:
+            result = fn(result, item)
+        return result
+
+    def count(self):
+        return sum(1 for _ in self)
+
+    def collect(self):
+        return list(self)
+
+
+def _fuse(items, stages):
+    """Run a run of map/filter stages as one loop over items."""
+    stages = tuple(stages)
+    for item in items:
+        for kind, fn in stages:
+            if kind is _MAP:
+                item = fn(item)
+            elif not fn(item):
+                break
+        else:
+            yield item
+
+
+def _batch(items, size):
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _window(items, size, step):
+    window = deque(maxlen=size)
+    skip = 0
+    for item in items:
+        window.append(item)
+        if skip:
+            skip -= 1
+            continue
+        if len(window) == size:
+            yield tuple(window)
+            skip = step - 1
+
+
+def _take(items, n):
+    return islice(items, n)
+
+
+def _parallel_map(items, fn, workers, processes, in_flight):
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def users(**options):
+    """Pipeline over stream_users (options are passed through)."""
+    stream_users = __import__('0-stream_users').stream_users
+    return Pipeline(stream_users(**options))
+
+
+def user_batches(batch_size, **options):
+    """Pipeline over stream_users_in_batches (options are passed through)."""
+    processing = __import__('1-batch_processing')
+    return Pipeline(processing.stream_users_in_batches(batch_size, **options))
+
+
+def user_ages():
+    """Pipeline over stream_user_ages."""
+    return Pipeline(__import__('4-stream_ages').stream_user_ages())
@@ -1,16 +1,27 @@
-import mysql.connector
 import csv
+import os
+import time
 import uuid
+from itertools import islice
 from mysql.connector import Error
 
+import db_pool
+
+# Namespace for deterministic user ids: user_id = uuid5(USER_ID_NAMESPACE, email)
+USER_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, 'user_data.alx_prodev')
+
+UPSERT_USER = """
+    INSERT INTO user_data (user_id, name, email, age)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name), email = VALUES(email), age = VALUES(age)
+"""
+
 # Connect to MySQL server (no database yet)
+# Credentials come from the MYSQL_* environment variables, see db_pool
 def connect_db():
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword"  # replace with your actual password
-        )
+        connection = db_pool.get_connection(database=False)
         if connection.is_connected():
             return connection
     except Error as e:
@@ -30,15 +41,11 @@ def create_database(connection):
         print(f"Error creating database: {e}")
 
 
-# Connect directly to the ALX_prodev database
+# Borrow a pooled connection to the ALX_prodev database;
+# close() returns it to the pool
 def connect_to_prodev():
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="yourpassword",  # replace with your actual password
-            database="ALX_prodev"
-        )
+        connection = db_pool.get_connection()
         if connection.is_connected():
             return connection
     except Error as e:
@@ -56,31 +63,262 @@ def create_table(connection):
                 name VARCHAR(255) NOT NULL,
                 email VARCHAR(255) NOT NULL,
                 age DECIMAL(3,0) NOT NULL,
-                INDEX (user_id)
+                updated_at TIMESTAMP(6) NOT NULL
+                    DEFAULT CURRENT_TIMESTAMP(6)
+                    ON UPDATE CURRENT_TIMESTAMP(6),
+                INDEX (user_id),
+                INDEX (updated_at, user_id)
             );
         """)
         connection.commit()
         cursor.close()
         print("Table user_data created successfully.")
+        add_change_tracking(connection)
     except Error as e:
         print(f"Error creating table: {e}")
 
 
-# Insert data from CSV if not already inserted
-def insert_data(connection, csv_file):
+# Add the updated_at column used by stream_changes to an older user_data table
+def add_change_tracking(connection):
     try:
         cursor = connection.cursor()
-        with open(csv_file, 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                cursor.execute("""
-                    INSERT INTO user_data (user_id, name, email, age)
-                    VALUES (%s, %s, %s, %s)
-                """, (str(uuid.uuid4()), row['name'], row['email'], row['age']))
+        cursor.execute("""
+            SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND TABLE_NAME = 'user_data' AND COLUMN_NAME = 'updated_at'
+        """)
+        (present,) = cursor.fetchone()
+        if not present:
+            cursor.execute("""
+                ALTER TABLE user_data
+                    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+                        DEFAULT CURRENT_TIMESTAMP(6)
+                        ON UPDATE CURRENT_TIMESTAMP(6),
+                    ADD INDEX (updated_at, user_id)
+            """)
+            connection.commit()
+            print("Added updated_at change tracking to user_data.")
+        cursor.close()
+    except Error as e:
+        print(f"Error adding change tracking: {e}")
+
+
+# Deterministic user id, so re-running the seed never creates duplicates
+def user_id_for(email):
+    return str(uuid.uuid5(USER_ID_NAMESPACE, email.strip().lower()))
+
+
+def _checkpoint_path(csv_file):
+    return f"{csv_file}.checkpoint"
+
+
+# Size and modification time identifying one version of csv_file
+def _file_signature(csv_file):
+    stat = os.stat(csv_file)
+    return f"{stat.st_size} {stat.st_mtime_ns}"
+
+
+# Byte offset into csv_file up to which rows are committed (0 if none).
+# A checkpoint left by a different version of the file (replaced or
+# regenerated at the same path) is ignored, so the load starts over
+def read_checkpoint(csv_file):
+    try:
+        with open(_checkpoint_path(csv_file), 'r') as file:
+            offset, _, signature = file.read().strip().partition(' ')
+        if signature != _file_signature(csv_file):
+            return 0
+        return int(offset or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def write_checkpoint(csv_file, offset):
+    path = _checkpoint_path(csv_file)
+    with open(path + '.tmp', 'w') as file:
+        file.write(f"{offset} {_file_signature(csv_file)}")
+    os.replace(path + '.tmp', path)
+
+
+def clear_checkpoint(csv_file):
+    try:
+        os.remove(_checkpoint_path(csv_file))
+    except FileNotFoundError:
+        pass
+
+
+# Decoded lines of a binary file, read lazily so file.tell() stays just
+# past whatever the csv reader has consumed
+def _decoded_lines(file):
+    for line in iter(file.readline, b''):
+        yield line.decode('utf-8')
+
+
+# Yield (offset, row) from csv_file starting at a byte offset, where offset
+# is the position just past the row so it can be stored as a checkpoint.
+# A real csv reader consumes the lines, so quoted fields may span lines
+def read_csv_rows(csv_file, start_offset=0):
+    with open(csv_file, 'rb') as file:
+        reader = csv.reader(_decoded_lines(file))
+        header = next(reader)
+        if start_offset > file.tell():
+            file.seek(start_offset)
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            row = dict(zip(header, values))
+            yield file.tell(), (
+                user_id_for(row['email']), row['name'], row['email'], row['age']
+            )
+
+
+# Insert (or update) data from CSV, resuming after the last checkpoint
+def insert_data(connection, csv_file, checkpoint_every=1000):
+    try:
+        cursor = connection.cursor()
+        offset = read_checkpoint(csv_file)
+        if offset:
+            print(f"Resuming from byte {offset} of {csv_file}.")
+        pending = 0
+        for offset, values in read_csv_rows(csv_file, offset):
+            cursor.execute(UPSERT_USER, values)
+            pending += 1
+            if pending == checkpoint_every:
+                connection.commit()
+                write_checkpoint(csv_file, offset)
+                pending = 0
         connection.commit()
         cursor.close()
+        clear_checkpoint(csv_file)
         print("Data inserted successfully from CSV.")
     except Error as e:
         print(f"Error inserting data: {e}")
     except FileNotFoundError:
         print("CSV file not found.")
+
+
+# Group CSV rows into lists of at most chunk_size rows
+def _chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Bulk-load the CSV, committing once per chunk instead of once at the end
+def bulk_insert_data(connection, csv_file, chunk_size=10000, use_load_data=False):
+    """
+    Load csv_file into user_data in fixed-size chunks.
+    Rows are upserted with a multi-row executemany and committed per chunk,
+    checkpointing after each commit so an interrupted load resumes where it
+    stopped. With use_load_data=True the file is sent in one
+    LOAD DATA LOCAL INFILE into a temporary staging table and upserted
+    from there (the connection must be opened with allow_local_infile=True,
+    e.g. after db_pool.configure_pool(allow_local_infile=True)). Upserting
+    leaves unchanged rows untouched, so their updated_at stays put and
+    stream_changes doesn't see a reload as a change to every row.
+    Returns the number of rows written.
+    """
+    start = time.perf_counter()
+    total = 0
+    try:
+        cursor = connection.cursor()
+        if use_load_data:
+            # Same uuid5 derivation as user_id_for(), computed server-side
+            sha = (f"SHA1(CONCAT(UNHEX('{USER_ID_NAMESPACE.hex}'), "
+                   f"LOWER(TRIM(email))))")
+            # A failed earlier load may have left it on this pooled connection
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS user_data_load")
+            cursor.execute("""
+                CREATE TEMPORARY TABLE user_data_load (
+                    user_id CHAR(36), name VARCHAR(255),
+                    email VARCHAR(255), age DECIMAL(3,0))
+            """)
+            cursor.execute(f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE user_data_load
+                FIELDS TERMINATED BY ',' ENCLOSED BY '"'
+                LINES TERMINATED BY '\\n'
+                IGNORE 1 LINES
+                (name, email, age)
+                SET user_id = LOWER(CONCAT(
+                    SUBSTR({sha}, 1, 8), '-', SUBSTR({sha}, 9, 4), '-',
+                    '5', SUBSTR({sha}, 14, 3), '-',
+                    HEX((CONV(SUBSTR({sha}, 17, 2), 16, 10) & 0x3F) | 0x80),
+                    SUBSTR({sha}, 19, 2), '-', SUBSTR({sha}, 21, 12)))
+            """, (csv_file,))
+            total = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO user_data (user_id, name, email, age)
+                SELECT user_id, name, email, age FROM user_data_load
+                ON DUPLICATE KEY UPDATE
+                    name = VALUES(name), email = VALUES(email), age = VALUES(age)
+            """)
+            connection.commit()
+            cursor.execute("DROP TEMPORARY TABLE user_data_load")
+        else:
+            offset = read_checkpoint(csv_file)
+            if offset:
+                print(f"Resuming from byte {offset} of {csv_file}.")
+            for chunk in _chunks(read_csv_rows(csv_file, offset), chunk_size):
+                cursor.executemany(UPSERT_USER, [values for _, values in chunk])
+                connection.commit()
+                write_checkpoint(csv_file, chunk[-1][0])
+                total += len(chunk)
+            clear_checkpoint(csv_file)
+        cursor.close()
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0
+        print(f"Inserted {total} rows in {elapsed:.2f}s ({rate:.0f} rows/sec).")
+        return total
+    except Error as e:
+        connection.rollback()
+        print(f"Error bulk inserting data: {e}")
+        return total
+    except FileNotFoundError:
+        print("CSV file not found.")
+        return 0
+
+
+# Parse the CSV on a process pool and load it chunk by chunk
+def parallel_insert_data(connection, csv_file, workers=None,
+                         chunk_mb=32, batch_size=10000):
+    """
+    Load csv_file with parsing and validation spread over `workers`
+    processes (see csv_parser). Parsed byte ranges are upserted in file
+    order and checkpointed after each range, like bulk_insert_data.
+    Invalid rows (bad email, age out of range) are skipped and counted.
+    Returns the number of rows written.
+    """
+    import csv_parser
+
+    start = time.perf_counter()
+    total = 0
+    rejected = 0
+    try:
+        cursor = connection.cursor()
+        offset = read_checkpoint(csv_file)
+        if offset:
+            print(f"Resuming from byte {offset} of {csv_file}.")
+        for end, rows, bad in csv_parser.parse_parallel(
+                csv_file, workers, chunk_mb * 1024 * 1024, offset):
+            for chunk in _chunks(rows, batch_size):
+                cursor.executemany(UPSERT_USER, chunk)
+            connection.commit()
+            write_checkpoint(csv_file, end)
+            total += len(rows)
+            rejected += bad
+        clear_checkpoint(csv_file)
+        cursor.close()
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0
+        print(f"Inserted {total} rows ({rejected} rejected) in {elapsed:.2f}s "
+              f"({rate:.0f} rows/sec).")
+        return total
+    except Error as e:
+        connection.rollback()
+        print(f"Error bulk inserting data: {e}")
+        return total
+    except FileNotFoundError:
+        print("CSV file not found.")
+        return 0
@@ -0,0 +1,84 @@
+import json
+import os
+from datetime import datetime
+
+import seed
+
+WATERMARK_FILE = "user_data.watermark"
+
+
+def load_watermark(path=WATERMARK_FILE):
+    """(updated_at, user_id) of the last row delivered, or None."""
+    try:
+        with open(path, 'r') as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return None
+    return datetime.fromisoformat(data["updated_at"]), data["user_id"]
+
+
+def save_watermark(watermark, path=WATERMARK_FILE):
+    updated_at, user_id = watermark
+    with open(path + '.tmp', 'w') as file:
+        json.dump({"updated_at": updated_at.isoformat(), "user_id": user_id},
+                  file)
+    os.replace(path + '.tmp', path)
+
+
+def _fetch_changes(connection, watermark, batch_size, lag_seconds):
+    # End the previous batch's read transaction: under REPEATABLE READ it
+    # would keep reading the first batch's snapshot while NOW(6) moves on,
+    # hiding rows committed since then that the watermark then passes
+    connection.rollback()
+    cursor = connection.cursor(dictionary=True)
+    # Rows stamped in the last lag_seconds are left for the next run, so a
+    # transaction that commits late with an earlier timestamp isn't skipped
+    upper = "updated_at < NOW(6) - INTERVAL %s MICROSECOND"
+    lag = int(lag_seconds * 1_000_000)
+    if watermark is None:
+        cursor.execute(
+            f"SELECT * FROM user_data WHERE {upper} "
+            "ORDER BY updated_at, user_id LIMIT %s",
+            (lag, batch_size)
+        )
+    else:
+        cursor.execute(
+            f"SELECT * FROM user_data WHERE (updated_at, user_id) > (%s, %s) "
+            f"AND {upper} ORDER BY updated_at, user_id LIMIT %s",
+            (*watermark, lag, batch_size)
+        )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def stream_changes(watermark_file=WATERMARK_FILE, batch_size=1000,
+                   lag_seconds=1.0):
+    """
+    Generator that yields only the user_data rows inserted or changed
+    since the last run, in (updated_at, user_id) order.
+    The watermark is saved once every row of a batch has been consumed,
+    so an interrupted run repeats at most one batch on the next call.
+    """
+    watermark = load_watermark(watermark_file)
+    connection = seed.connect_to_prodev()
+    try:
+        while True:
+            rows = _fetch_changes(connection, watermark, batch_size,
+                                  lag_seconds)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+            watermark = (rows[-1]["updated_at"], rows[-1]["user_id"])
+            save_watermark(watermark, watermark_file)
+    finally:
+        connection.close()
+
+
+def reset_watermark(watermark_file=WATERMARK_FILE):
+    """Forget the watermark so the next run streams the whole table."""
+    try:
+        os.remove(watermark_file)
+    except FileNotFoundError:
+        pass
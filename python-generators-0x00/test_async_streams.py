@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Unit tests for early exit and cancellation in async_streams._stream.
+
+The aiomysql pool is replaced by in-memory fakes that count how many
+rows are fetched, so no MySQL server is needed.
+"""
+
+import asyncio
+import contextlib
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import async_streams  # noqa: E402
+
+
+class FakeCursor:
+    """Unbuffered cursor over `rows`; close() reads whatever is left."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.fetched = 0
+        self.closed = False
+
+    async def execute(self, sql, params=()):
+        pass
+
+    async def fetchmany(self, size):
+        await asyncio.sleep(0)
+        batch = self.rows[self.fetched:self.fetched + size]
+        self.fetched += len(batch)
+        return batch
+
+    async def close(self):
+        self.fetched = len(self.rows)
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = False
+
+    async def cursor(self, cursor_class=None):
+        return self._cursor
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.released = []
+
+    async def acquire(self):
+        return self.conn
+
+    def release(self, conn):
+        self.released.append(conn)
+
+
+class TestStreamCleanup(unittest.TestCase):
+    """Stopping a stream early must not read the rest of the result."""
+
+    def setUp(self) -> None:
+        self.cursor = FakeCursor({"age": age} for age in range(1000))
+        self.conn = FakeConnection(self.cursor)
+        self.pool = FakePool(self.conn)
+
+        async def get_pool():
+            return self.pool
+
+        patcher = patch.object(async_streams, "get_async_pool", get_pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_break_stops_fetching(self) -> None:
+        """Breaking after N rows drops the connection without a read-out."""
+        async def take(n):
+            seen = []
+            async with contextlib.aclosing(
+                    async_streams.async_stream_users(prefetch=10)) as users:
+                async for row in users:
+                    seen.append(row)
+                    if len(seen) == n:
+                        break
+            return seen
+
+        self.assertEqual(len(asyncio.run(take(25))), 25)
+        self.assertEqual(self.cursor.fetched, 30)
+        self.assertFalse(self.cursor.closed)
+        self.assertTrue(self.conn.closed)
+        self.assertEqual(self.pool.released, [self.conn])
+
+    def test_cancel_stops_fetching(self) -> None:
+        """Cancelling the consuming task also skips reading the rest."""
+        async def consume():
+            async for _ in async_streams.async_stream_users(prefetch=10):
+                await asyncio.sleep(0.01)
+
+        async def run():
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        self.assertLess(self.cursor.fetched, 1000)
+        self.assertFalse(self.cursor.closed)
+        self.assertTrue(self.conn.closed)
+        self.assertEqual(self.pool.released, [self.conn])
+
+    def test_drained_stream_keeps_connection(self) -> None:
+        """A fully read stream closes the cursor and pools the connection."""
+        async def count():
+            return len([row async for row in
+                        async_streams.async_stream_users(prefetch=64)])
+
+        self.assertEqual(asyncio.run(count()), 1000)
+        self.assertTrue(self.cursor.closed)
+        self.assertFalse(self.conn.closed)
+        self.assertEqual(self.pool.released, [self.conn])
+
+
+if __name__ == "__main__":
+    unittest.main()
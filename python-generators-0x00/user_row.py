@@ -0,0 +1,47 @@
+import uuid
+
+
+class UserRow:
+    """
+    Compact representation of a user_data row.
+    __slots__ drops the per-instance dict, the UUID is kept as its 16 raw
+    bytes and age as an int instead of a Decimal.
+    """
+    __slots__ = ("user_id_bytes", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        if isinstance(user_id, str):
+            user_id = uuid.UUID(user_id).bytes
+        self.user_id_bytes = user_id
+        self.name = name
+        self.email = email
+        self.age = int(age)
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a (user_id, name, email, age) tuple or a row dict."""
+        if isinstance(row, dict):
+            return cls(row["user_id"], row["name"], row["email"], row["age"])
+        return cls(*row)
+
+    @property
+    def user_id(self):
+        return str(uuid.UUID(bytes=self.user_id_bytes))
+
+    def as_dict(self):
+        return {
+            "user_id": self.user_id,
+            "name": self.name,
+            "email": self.email,
+            "age": self.age,
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, UserRow):
+            return NotImplemented
+        return (self.user_id_bytes, self.name, self.email, self.age) == \
+            (other.user_id_bytes, other.name, other.email, other.age)
+
+    def __repr__(self):
+        return (f"UserRow(user_id={self.user_id!r}, name={self.name!r}, "
+                f"email={self.email!r}, age={self.age})")